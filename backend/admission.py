@@ -0,0 +1,145 @@
+import asyncio
+import os
+
+from starlette.responses import JSONResponse
+
+# Admission control settings
+ADMISSION_ENABLED = os.environ.get("ADMISSION_CONTROL", "true").lower() in ("1", "true", "yes")
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT_SECONDS", "2"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.environ.get("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+
+# Concurrency and queue limits per route class
+ROUTE_CLASS_LIMITS = {
+    "auth": (
+        int(os.environ.get("ADMISSION_AUTH_CONCURRENCY", "16")),
+        int(os.environ.get("ADMISSION_AUTH_QUEUE", "64")),
+    ),
+    "reads": (
+        int(os.environ.get("ADMISSION_READS_CONCURRENCY", "64")),
+        int(os.environ.get("ADMISSION_READS_QUEUE", "256")),
+    ),
+    "writes": (
+        int(os.environ.get("ADMISSION_WRITES_CONCURRENCY", "16")),
+        int(os.environ.get("ADMISSION_WRITES_QUEUE", "64")),
+    ),
+}
+
+# Paths that are never limited, so health checks and admin metrics stay reachable
+EXEMPT_PATHS = ("/api/admin/",)
+EXEMPT_EXACT_PATHS = ("/",)
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+def classify(method, path):
+    """Return the route class of a request, or None if it is not limited"""
+    if path in EXEMPT_EXACT_PATHS or path.startswith(EXEMPT_PATHS):
+        return None
+    if path.startswith("/api/auth/"):
+        return "auth"
+    if method in WRITE_METHODS:
+        return "writes"
+    return "reads"
+
+
+class RouteClassLimiter:
+    """Concurrency limit with a bounded, deadline-limited wait queue"""
+
+    def __init__(self, name, concurrency, max_queue, queue_timeout_seconds):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_deadline = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def acquire(self):
+        """Wait for a slot; return False if the request should be shed"""
+        if not self._semaphore.locked():
+            # A slot is free, so this returns without suspending
+            await self._semaphore.acquire()
+        elif self.queued >= self.max_queue:
+            self.shed_queue_full += 1
+            return False
+        else:
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout_seconds)
+            except asyncio.TimeoutError:
+                self.shed_deadline += 1
+                return False
+            finally:
+                self.queued -= 1
+
+        self.in_flight += 1
+        self.admitted += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self):
+        return {
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_deadline": self.shed_deadline,
+        }
+
+
+class AdmissionController:
+    def __init__(self, limits=ROUTE_CLASS_LIMITS, queue_timeout_seconds=ADMISSION_QUEUE_TIMEOUT_SECONDS):
+        self.limiters = {
+            name: RouteClassLimiter(name, concurrency, max_queue, queue_timeout_seconds)
+            for name, (concurrency, max_queue) in limits.items()
+        }
+
+    @property
+    def concurrency(self):
+        """Requests that can be in flight at once across all route classes"""
+        return sum(limiter.concurrency for limiter in self.limiters.values())
+
+    def stats(self):
+        return {name: limiter.stats() for name, limiter in self.limiters.items()}
+
+
+class AdmissionMiddleware:
+    """Shed load per route class with fast 503s once its queue is full or too slow.
+
+    Booking rushes fill the `writes` queue and get shed there, while reads
+    and auth keep their own slots and stay responsive.
+    """
+
+    def __init__(self, app, controller, retry_after_seconds=ADMISSION_RETRY_AFTER_SECONDS):
+        self.app = app
+        self.controller = controller
+        self.retry_after_seconds = retry_after_seconds
+
+    async def __call__(self, scope, receive, send):
+        route_class = classify(scope.get("method", ""), scope.get("path", "")) if scope["type"] == "http" else None
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.controller.limiters[route_class]
+        if not await limiter.acquire():
+            response = JSONResponse(
+                {"detail": "Server is busy, please retry later"},
+                status_code=503,
+                headers={"Retry-After": str(self.retry_after_seconds)},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
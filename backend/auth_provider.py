@@ -0,0 +1,65 @@
+import os
+
+from database import STORAGE_BACKEND
+
+# Auth backend settings
+AUTH_BACKEND = os.environ.get("AUTH_BACKEND", "emergent")
+EMERGENT_SESSION_DATA_URL = os.environ.get(
+    "EMERGENT_SESSION_DATA_URL",
+    "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
+)
+
+# Prefix of the session ids accepted by the stub provider
+STUB_SESSION_PREFIX = "stub:"
+
+
+class EmergentAuthProvider:
+    """Resolves OAuth session ids through the Emergent Auth session-data API"""
+
+    def __init__(self, session_data_url=EMERGENT_SESSION_DATA_URL):
+        self.session_data_url = session_data_url
+
+    def get_session_data(self, session_id):
+        """Return the user's email, name and picture, or None if the session is invalid"""
+        # requests is only needed here, so import it lazily
+        import requests
+
+        response = requests.get(self.session_data_url, headers={"X-Session-ID": session_id})
+        if response.status_code != 200:
+            return None
+        return response.json()
+
+
+class StubAuthProvider:
+    """Offline provider for tests and benchmarks.
+
+    Session ids of the form `stub:<email>` resolve to a user with that email;
+    ids registered with `register` resolve to the given user data. Anything
+    else is rejected, just like an unknown session at the real provider.
+    """
+
+    def __init__(self):
+        self._sessions = {}
+
+    def register(self, session_id, user_data):
+        self._sessions[session_id] = user_data
+
+    def get_session_data(self, session_id):
+        if session_id in self._sessions:
+            return dict(self._sessions[session_id])
+        if session_id.startswith(STUB_SESSION_PREFIX):
+            email = session_id[len(STUB_SESSION_PREFIX):]
+            if "@" in email:
+                return {"email": email, "name": email.split("@")[0], "picture": ""}
+        return None
+
+
+def get_auth_provider(backend=AUTH_BACKEND, storage_backend=STORAGE_BACKEND):
+    if backend == "emergent":
+        return EmergentAuthProvider()
+    if backend == "stub":
+        # The stub logs anyone in as any email, so never let it near real data
+        if storage_backend != "memory":
+            raise ValueError("AUTH_BACKEND=stub is only allowed with STORAGE_BACKEND=memory")
+        return StubAuthProvider()
+    raise ValueError(f"Unknown AUTH_BACKEND {backend!r}")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for the main API endpoints, run fully offline against an
+in-process app (in-memory storage, stub auth) so timings are repeatable.
+
+    python bench_load.py --sessions 200 --requests 500
+"""
+import argparse
+import os
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("AUTH_BACKEND", "stub")
+os.environ.setdefault("SESSION_MAINTENANCE_INTERVAL_SECONDS", "0")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import server  # noqa: E402
+
+COACHES = ["Мурат Досжанов", "Айбек Кудайбергенов", "Алия Сагынбекова", "Марат Абдуллаев", "Камила Есенова"]
+LOCATION = "AIGA Academy, г. Астана, ул. Ахмедьярова, 3"
+
+
+def seed(db, session_count):
+    """Insert `session_count` active training sessions and return their ids"""
+    session_ids = []
+    for index in range(session_count):
+        session_id = str(uuid.uuid4())
+        db.training_sessions.insert_one({
+            "session_id": session_id,
+            "coach_id": f"coach-{index % len(COACHES)}",
+            "title": f"Тренировка #{index}",
+            "description": "Изучение базовых техник грэпплинга, захватов и контроля позиции.",
+            "training_type": "beginner_grappling",
+            "coach_name": COACHES[index % len(COACHES)],
+            "date": (datetime.now() + timedelta(days=1 + index % 14)).strftime("%Y-%m-%d"),
+            "time": "18:00",
+            "duration_minutes": 90,
+            "max_participants": 1000,
+            "current_participants": 0,
+            "price": 3000.0,
+            "location": LOCATION,
+            "created_at": datetime.now(),
+            "status": "active",
+        })
+        session_ids.append(session_id)
+    return session_ids
+
+
+def login(client, email):
+    response = client.post("/api/auth/session", json={"session_id": f"stub:{email}"})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['session_token']}"}
+
+
+def measure(name, count, call):
+    latencies = []
+    for index in range(count):
+        started = time.perf_counter()
+        response = call(index)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 500:
+            raise RuntimeError(f"{name} failed with {response.status_code}")
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"  {name:<28} {count / (sum(latencies) / 1000):8.0f} req/s   "
+        f"p50 {statistics.median(latencies):6.2f}ms   p95 {p95:6.2f}ms   max {latencies[-1]:6.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200, help="training sessions to seed")
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    args = parser.parse_args()
+
+    with TestClient(server.app) as client:
+        session_ids = seed(server.db, args.sessions)
+        headers = login(client, "student@aiga.kz")
+
+        print(f"Seeded {args.sessions} sessions, {args.requests} requests per endpoint")
+        measure("GET /api/training-sessions", args.requests, lambda i: client.get("/api/training-sessions"))
+        measure("GET /api/stats", args.requests, lambda i: client.get("/api/stats"))
+        measure("GET /api/users/profile", args.requests, lambda i: client.get("/api/users/profile", headers=headers))
+        measure(
+            "POST /api/bookings",
+            min(args.requests, args.sessions),
+            lambda i: client.post(
+                "/api/bookings",
+                json={"session_id": session_ids[i], "student_id": "", "booking_date": ""},
+                headers=headers,
+            ),
+        )
+        measure("GET /api/bookings/my", args.requests, lambda i: client.get("/api/bookings/my", headers=headers))
+
+
+if __name__ == "__main__":
+    main()
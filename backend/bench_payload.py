@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Payload benchmark: bytes on the wire for the list endpoints with and without
+compression and the compact response shape, against an in-process app.
+
+    python bench_payload.py --sessions 200
+"""
+import argparse
+import os
+
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("AUTH_BACKEND", "stub")
+os.environ.setdefault("SESSION_MAINTENANCE_INTERVAL_SECONDS", "0")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import server  # noqa: E402
+from bench_load import login, seed  # noqa: E402
+from compression import supported_encodings  # noqa: E402
+
+ENCODINGS = ("identity",) + tuple(reversed(supported_encodings()))
+
+
+def wire_bytes(client, path, encoding, headers=None):
+    response = client.get(path, headers={**(headers or {}), "Accept-Encoding": encoding})
+    response.raise_for_status()
+    return response.num_bytes_downloaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200, help="training sessions to seed")
+    parser.add_argument("--bookings", type=int, default=50, help="bookings made by the measured student")
+    args = parser.parse_args()
+
+    with TestClient(server.app) as client:
+        session_ids = seed(server.db, args.sessions)
+        headers = login(client, "student@aiga.kz")
+        for session_id in session_ids[: args.bookings]:
+            client.post(
+                "/api/bookings",
+                json={"session_id": session_id, "student_id": "", "booking_date": ""},
+                headers=headers,
+            ).raise_for_status()
+
+        print(f"Seeded {args.sessions} sessions, {min(args.bookings, args.sessions)} bookings")
+        print(f"  {'endpoint':<40}" + "".join(f"{encoding:>12}" for encoding in ENCODINGS))
+        for path in ("/api/training-sessions", "/api/bookings/my"):
+            for suffix in ("", "?compact=true"):
+                sizes = [wire_bytes(client, path + suffix, encoding, headers) for encoding in ENCODINGS]
+                print(f"  {path + suffix:<40}" + "".join(f"{size:>12,}" for size in sizes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: cold import time of the server module and latency of the
+first request served by the app, each measured in a new
+interpreter so nothing is warm.
+
+    python bench_startup.py --runs 10 --path /
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import server
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(server.app) as client:
+    ready = time.perf_counter()
+    response = client.get(sys.argv[1])
+    answered = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "lifespan_ms": (ready - imported) * 1000,
+    "first_request_ms": (answered - ready) * 1000,
+    "status": response.status_code,
+}))
+"""
+
+
+def run_probe(path):
+    env = dict(os.environ)
+    # Keep background jobs out of the measurement
+    env.setdefault("SESSION_MAINTENANCE_INTERVAL_SECONDS", "0")
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, path],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="number of cold starts to measure")
+    parser.add_argument("--path", default="/", help="path requested after startup")
+    args = parser.parse_args()
+
+    results = [run_probe(args.path) for _ in range(args.runs)]
+
+    print(f"Cold starts: {args.runs}, first request: GET {args.path} -> {results[-1]['status']}")
+    for key in ("import_ms", "lifespan_ms", "first_request_ms"):
+        values = [result[key] for result in results]
+        print(f"  {key:<18} median {statistics.median(values):8.1f}   min {min(values):8.1f}   max {max(values):8.1f}")
+
+
+if __name__ == "__main__":
+    main()
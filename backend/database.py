@@ -0,0 +1,57 @@
+import os
+
+from diagnostics import event_listeners, slow_query_log
+
+# Storage backend: "mongo" (default) or "memory" for offline tests and benchmarks
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "mongo")
+
+
+class Database:
+    """Handle to the application database that connects on first use.
+
+    The app lifespan calls `connect()` so importing the server never creates
+    a MongoClient (or imports pymongo). Collections are reached as attributes,
+    e.g. `db.users` or `db["users"]`, exactly like a pymongo Database. With the "memory"
+    backend the collections live in process (see memory_store).
+    """
+
+    def __init__(self, url, name, backend=STORAGE_BACKEND):
+        self.url = url
+        self.name = name
+        self.backend = backend
+        self.client = None
+        self._database = None
+
+    def connect(self):
+        if self._database is not None:
+            return self._database
+
+        if self.backend == "memory":
+            from memory_store import MemoryDatabase
+
+            self._database = MemoryDatabase(self.name)
+        elif self.backend == "mongo":
+            # Imported here so the server module loads without pymongo
+            from pymongo import MongoClient
+
+            self.client = MongoClient(self.url, event_listeners=event_listeners())
+            slow_query_log.bind(self.client)
+            self._database = self.client[self.name]
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND {self.backend!r}")
+        return self._database
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+        self.client = None
+        self._database = None
+
+    def __getitem__(self, name):
+        return self.connect()[name]
+
+    def __getattr__(self, name):
+        # Only called for attributes not set in __init__, i.e. collections
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.connect(), name)
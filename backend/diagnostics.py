@@ -0,0 +1,262 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Slow-query log settings
+SLOW_QUERY_LOG_ENABLED = os.environ.get("SLOW_QUERY_LOG", "false").lower() in ("1", "true", "yes")
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", "100"))
+SLOW_QUERY_EXPLAIN = os.environ.get("SLOW_QUERY_EXPLAIN", "false").lower() in ("1", "true", "yes")
+SLOW_QUERY_MAX_ENTRIES = int(os.environ.get("SLOW_QUERY_MAX_ENTRIES", "500"))
+
+# Route of the request currently being handled, set by the HTTP middleware
+current_route = contextvars.ContextVar("current_route", default="background")
+
+# Commands recorded by the listener
+OBSERVED_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify", "insert"}
+
+# Command fields added by the driver that must not be sent back with `explain`
+DRIVER_FIELDS = {"lsid", "txnNumber", "$db", "$clusterTime", "$readPreference", "readConcern", "writeConcern"}
+
+
+def redact_filter(value):
+    """Replace every literal in a query filter with "?" while keeping its shape"""
+    if isinstance(value, dict):
+        return {key: redact_filter(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # `$in: [a, b, c]` and `$in: [a]` have the same shape
+        return [redact_filter(value[0])] if value else []
+    return "?"
+
+
+def extract_filter(command_name, command):
+    """Return the query filter carried by a command document"""
+    if command_name == "find":
+        return command.get("filter", {})
+    if command_name in ("count", "distinct"):
+        return command.get("query", {})
+    if command_name == "findAndModify":
+        return command.get("query", {})
+    if command_name == "aggregate":
+        # count_documents is sent as an aggregate starting with $match
+        for stage in command.get("pipeline", []):
+            if "$match" in stage:
+                return stage["$match"]
+        return {}
+    if command_name == "update":
+        updates = command.get("updates", [])
+        return updates[0].get("q", {}) if updates else {}
+    if command_name == "delete":
+        deletes = command.get("deletes", [])
+        return deletes[0].get("q", {}) if deletes else {}
+    return {}
+
+
+def find_explain_field(explain_output, field):
+    """Return the first `field` in explain output, wherever the server nests it"""
+    if isinstance(explain_output, dict):
+        if field in explain_output:
+            return explain_output[field]
+        children = explain_output.values()
+    elif isinstance(explain_output, list):
+        children = explain_output
+    else:
+        return None
+    for child in children:
+        found = find_explain_field(child, field)
+        if found is not None:
+            return found
+    return None
+
+
+def winning_plan_stages(explain_output):
+    """Return the stage names of the winning plan, outermost first"""
+    stages = []
+    plan = find_explain_field(explain_output, "winningPlan")
+    while isinstance(plan, dict):
+        plan = plan.get("queryPlan", plan)
+        if plan.get("stage"):
+            stages.append(plan["stage"])
+        plan = plan.get("inputStage")
+    return stages
+
+
+def summarize_explain(explain_output):
+    """Reduce explain output to plan stages and counters.
+
+    Raw explain output echoes the command and the parsed query, including
+    literal filter values such as session tokens, so it is never returned.
+    """
+    return {
+        "winning_plan": winning_plan_stages(explain_output),
+        "docs_examined": find_explain_field(explain_output, "totalDocsExamined"),
+        "keys_examined": find_explain_field(explain_output, "totalKeysExamined"),
+        "n_returned": find_explain_field(explain_output, "nReturned"),
+        "execution_time_ms": find_explain_field(explain_output, "executionTimeMillis"),
+    }
+
+
+class SlowQueryLog:
+    """Bounded in-memory log of Mongo operations slower than a threshold.
+
+    Operations are grouped by route, collection, command and redacted filter
+    shape so the admin endpoint can rank the worst offenders. The last raw
+    command of each group is kept (never returned) so `explain` can be run
+    against it on demand.
+    """
+
+    def __init__(self, threshold_ms=SLOW_QUERY_THRESHOLD_MS, max_entries=SLOW_QUERY_MAX_ENTRIES, auto_explain=SLOW_QUERY_EXPLAIN):
+        self.threshold_ms = threshold_ms
+        self.auto_explain = auto_explain
+        self.client = None
+        self.recent = deque(maxlen=max_entries)
+        self._groups = {}
+        self._lock = threading.Lock()
+        self._explain_pool = None
+
+    def bind(self, client):
+        """Attach the MongoClient used to run `explain`"""
+        self.client = client
+
+    def record(self, route, database, collection, command_name, command, duration_ms):
+        shape = redact_filter(extract_filter(command_name, command))
+        key = (route, collection, command_name, json.dumps(shape, sort_keys=True, default=str))
+        entry = {
+            "route": route,
+            "collection": collection,
+            "command": command_name,
+            "filter_shape": shape,
+            "duration_ms": round(duration_ms, 2),
+            "recorded_at": time.time(),
+        }
+
+        with self._lock:
+            self.recent.append(entry)
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = {
+                    "route": route,
+                    "collection": collection,
+                    "command": command_name,
+                    "filter_shape": shape,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "docs_examined": None,
+                    "winning_plan": None,
+                }
+            group["count"] += 1
+            group["total_ms"] += duration_ms
+            group["max_ms"] = max(group["max_ms"], duration_ms)
+            group["_database"] = database
+            group["_command"] = command
+
+        logger.warning(
+            "Slow query %.1fms route=%s collection=%s command=%s filter=%s",
+            duration_ms, route, collection, command_name, key[3],
+        )
+
+        if self.auto_explain and group["docs_examined"] is None and self.client is not None:
+            if self._explain_pool is None:
+                self._explain_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+            self._explain_pool.submit(self._explain_group, group)
+
+    def _explain_group(self, group):
+        try:
+            output = self.explain(group["_database"], group["_command"])
+        except Exception as exc:
+            logger.debug("explain failed for %s.%s: %s", group["collection"], group["command"], exc)
+            return None
+        summary = summarize_explain(output)
+        group["docs_examined"] = summary["docs_examined"]
+        group["winning_plan"] = summary["winning_plan"]
+        return summary
+
+    def explain(self, database, command):
+        """Run `explain` with executionStats for a previously observed command"""
+        if self.client is None:
+            raise RuntimeError("Slow query log is not bound to a MongoClient")
+        command = {key: value for key, value in command.items() if key not in DRIVER_FIELDS}
+        return self.client[database].command("explain", command, verbosity="executionStats")
+
+    def top_offenders(self, limit=10, explain=False):
+        """Return slow-query groups ordered by total time spent, worst first"""
+        with self._lock:
+            groups = sorted(self._groups.values(), key=lambda group: group["total_ms"], reverse=True)[:limit]
+
+        offenders = []
+        for group in groups:
+            explain_summary = None
+            if explain and group["command"] != "insert":
+                explain_summary = self._explain_group(group)
+
+            offender = {key: value for key, value in group.items() if not key.startswith("_")}
+            offender["total_ms"] = round(offender["total_ms"], 2)
+            offender["max_ms"] = round(offender["max_ms"], 2)
+            offender["avg_ms"] = round(group["total_ms"] / group["count"], 2)
+            if explain_summary is not None:
+                offender["explain"] = explain_summary
+            offenders.append(offender)
+        return offenders
+
+    def clear(self):
+        with self._lock:
+            self.recent.clear()
+            self._groups.clear()
+
+
+class SlowQueryListener:
+    """pymongo command listener feeding operations over the threshold into a SlowQueryLog"""
+
+    def __init__(self, log):
+        self.log = log
+        self._pending = {}
+
+    def started(self, event):
+        if event.command_name not in OBSERVED_COMMANDS:
+            return
+        self._pending[(event.connection_id, event.request_id)] = (
+            current_route.get(),
+            event.database_name,
+            event.command.get(event.command_name),
+            event.command,
+        )
+
+    def _finished(self, event):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        duration_ms = event.duration_micros / 1000.0
+        if duration_ms < self.log.threshold_ms:
+            return
+        route, database, collection, command = pending
+        self.log.record(route, database, collection, event.command_name, command, duration_ms)
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        self._finished(event)
+
+
+slow_query_log = SlowQueryLog()
+
+
+def event_listeners():
+    """Listeners to pass to MongoClient; empty unless SLOW_QUERY_LOG is enabled"""
+    if not SLOW_QUERY_LOG_ENABLED:
+        return []
+
+    # pymongo is imported here so importing this module stays cheap
+    from pymongo import monitoring
+
+    class CommandListener(SlowQueryListener, monitoring.CommandListener):
+        pass
+
+    return [CommandListener(slow_query_log)]
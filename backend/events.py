@@ -0,0 +1,243 @@
+import asyncio
+import inspect
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Event bus settings
+EVENT_SOURCE = os.environ.get("EVENT_SOURCE", "inline")  # inline, changestream
+EVENT_QUEUE_SIZE = int(os.environ.get("EVENT_QUEUE_SIZE", "10000"))
+EVENT_BATCH_SIZE = int(os.environ.get("EVENT_BATCH_SIZE", "100"))
+EVENT_BATCH_WAIT_SECONDS = float(os.environ.get("EVENT_BATCH_WAIT_SECONDS", "0.5"))
+# Name under which this worker's change-stream tailer stores its resume token.
+# Required with EVENT_SOURCE=changestream; it must be stable across restarts and
+# unique per worker (e.g. "api-1", "api-2") so a restarted worker resumes.
+EVENT_TAILER_NAME = os.environ.get("EVENT_TAILER_NAME", "")
+
+# Domain events emitted for inserts into each collection
+INSERT_EVENTS = {
+    "users": "user.created",
+    "training_sessions": "training_session.created",
+    "bookings": "booking.created",
+}
+
+
+def make_event(event_type, data, event_id=None):
+    return {
+        "event_id": event_id or str(uuid.uuid4()),
+        "type": event_type,
+        "data": data,
+        "occurred_at": datetime.now(),
+    }
+
+
+class Subscriber:
+    """A handler with its own bounded queue and worker task"""
+
+    def __init__(self, name, event_types, handler, batch_size, max_wait_seconds, queue_size):
+        self.name = name
+        self.event_types = set(event_types)
+        self.handler = handler
+        self.batch_size = batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.queue_size = queue_size
+        self.queue = None
+        self.task = None
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def wants(self, event):
+        return "*" in self.event_types or event["type"] in self.event_types
+
+    async def _next_batch(self):
+        batch = [await self.queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait_seconds
+        while len(batch) < self.batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _handle(self, batch):
+        try:
+            if inspect.iscoroutinefunction(self.handler):
+                await self.handler(batch)
+            else:
+                # Sync handlers usually talk to Mongo, keep them off the event loop
+                await asyncio.to_thread(self.handler, batch)
+            self.processed += len(batch)
+        except Exception:
+            self.failed += len(batch)
+            logger.exception("Event subscriber %s failed on %d events", self.name, len(batch))
+        finally:
+            for _ in batch:
+                self.queue.task_done()
+
+    async def run(self):
+        while True:
+            await self._handle(await self._next_batch())
+
+    def stats(self):
+        return {
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "capacity": self.queue_size,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+class EventBus:
+    """In-process publish/subscribe bus for domain events.
+
+    `publish` never waits: each subscriber has a bounded queue, and when a
+    slow subscriber's queue is full further events for it are dropped and
+    counted instead of holding up the request that published them.
+    Subscribers receive events in batches from their own worker task.
+    """
+
+    def __init__(self, queue_size=EVENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.subscribers = []
+        self._loop = None
+
+    def subscribe(self, name, event_types, handler, batch_size=EVENT_BATCH_SIZE, max_wait_seconds=EVENT_BATCH_WAIT_SECONDS):
+        """Register `handler(events)`; use "*" in `event_types` for every event"""
+        subscriber = Subscriber(name, event_types, handler, batch_size, max_wait_seconds, self.queue_size)
+        self.subscribers.append(subscriber)
+        return subscriber
+
+    @property
+    def running(self):
+        return self._loop is not None
+
+    def publish(self, event_type, data, event_id=None):
+        """Queue an event for its subscribers; safe to call from any thread"""
+        loop = self._loop
+        if loop is None:
+            return None
+        event = make_event(event_type, data, event_id)
+        try:
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._dispatch(event)
+        else:
+            # Threadpool handlers and the change-stream tailer hand events to the loop
+            loop.call_soon_threadsafe(self._dispatch, event)
+        return event
+
+    def _dispatch(self, event):
+        for subscriber in self.subscribers:
+            if not subscriber.wants(event):
+                continue
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscriber.dropped += 1
+                logger.warning("Event queue of %s is full, dropping %s", subscriber.name, event["type"])
+
+    def start(self):
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        for subscriber in self.subscribers:
+            subscriber.queue = asyncio.Queue(maxsize=subscriber.queue_size)
+            subscriber.task = asyncio.create_task(subscriber.run())
+
+    async def stop(self, drain_timeout_seconds=5.0):
+        if not self.running:
+            return
+        self._loop = None
+        for subscriber in self.subscribers:
+            try:
+                await asyncio.wait_for(subscriber.queue.join(), drain_timeout_seconds)
+            except asyncio.TimeoutError:
+                logger.warning("Dropping %d undelivered events for %s", subscriber.queue.qsize(), subscriber.name)
+            subscriber.task.cancel()
+            try:
+                await subscriber.task
+            except asyncio.CancelledError:
+                pass
+            subscriber.task = None
+
+    def stats(self):
+        return {subscriber.name: subscriber.stats() for subscriber in self.subscribers}
+
+
+class ChangeStreamTailer:
+    """Emits domain events for inserts by tailing a Mongo change stream.
+
+    Runs in a background thread and persists the resume token of the last
+    published change in `resume_collection` under its own `name`, so a
+    restarted worker picks up where it left off. Requires Mongo to run as a
+    replica set.
+
+    Every worker tails the stream, so every worker sees every insert. Events
+    get their id from the change's resume token, which is the same in all
+    workers, so subscribers that write shared state can drop duplicates.
+    """
+
+    def __init__(self, db, bus, name=EVENT_TAILER_NAME, resume_collection="event_resume_tokens"):
+        self.db = db
+        self.bus = bus
+        self.name = name
+        self.resume_collection = resume_collection
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _load_resume_token(self):
+        record = self.db[self.resume_collection].find_one({"tailer": self.name}, {"_id": 0, "resume_token": 1})
+        return record["resume_token"] if record else None
+
+    def _save_resume_token(self, token):
+        self.db[self.resume_collection].update_one(
+            {"tailer": self.name},
+            {"$set": {"resume_token": token, "updated_at": datetime.now()}},
+            upsert=True,
+        )
+
+    def _run(self):
+        pipeline = [{"$match": {"operationType": "insert", "ns.coll": {"$in": list(INSERT_EVENTS)}}}]
+        while not self._stop.is_set():
+            try:
+                with self.db.watch(pipeline, resume_after=self._load_resume_token(), max_await_time_ms=1000) as stream:
+                    while not self._stop.is_set():
+                        change = stream.try_next()
+                        if change is None:
+                            continue
+                        document = change["fullDocument"]
+                        document.pop("_id", None)
+                        self.bus.publish(
+                            INSERT_EVENTS[change["ns"]["coll"]], document, event_id=change["_id"]["_data"]
+                        )
+                        self._save_resume_token(change["_id"])
+            except Exception:
+                logger.exception("Change stream tailer failed, retrying")
+                self._stop.wait(5)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        if not self.name:
+            raise ValueError("EVENT_SOURCE=changestream requires EVENT_TAILER_NAME, a stable per-worker name")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="change-stream-tailer", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        await asyncio.to_thread(self._thread.join)
+        self._thread = None
@@ -0,0 +1,370 @@
+import copy
+import threading
+import uuid
+
+# Comparison operators understood by the in-memory matcher
+COMPARISONS = {
+    "$lt": lambda value, operand: value is not None and value < operand,
+    "$lte": lambda value, operand: value is not None and value <= operand,
+    "$gt": lambda value, operand: value is not None and value > operand,
+    "$gte": lambda value, operand: value is not None and value >= operand,
+}
+
+MISSING = object()
+
+try:
+    # Raise the same error type as pymongo so callers can catch it either way
+    from pymongo.errors import DuplicateKeyError
+except ImportError:  # pragma: no cover - pymongo is always installed with the backend
+    class DuplicateKeyError(Exception):
+        pass
+
+
+class InsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+        self.acknowledged = True
+
+
+class InsertManyResult:
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+        self.acknowledged = True
+
+
+class UpdateResult:
+    def __init__(self, matched_count, modified_count, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+        self.acknowledged = True
+
+
+class BulkWriteResult:
+    def __init__(self, inserted_count=0, matched_count=0, modified_count=0, upserted_ids=None):
+        self.inserted_count = inserted_count
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_ids = upserted_ids or {}
+        self.upserted_count = len(self.upserted_ids)
+        self.acknowledged = True
+
+
+class DeleteResult:
+    def __init__(self, deleted_count):
+        self.deleted_count = deleted_count
+        self.acknowledged = True
+
+
+def get_path(document, path):
+    value = document
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return MISSING
+        value = value[part]
+    return value
+
+
+def set_path(document, path, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.setdefault(part, {})
+    document[parts[-1]] = value
+
+
+def unset_path(document, path):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.get(part)
+        if not isinstance(document, dict):
+            return
+    document.pop(parts[-1], None)
+
+
+def match_condition(value, condition):
+    if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+        for operator, operand in condition.items():
+            if operator == "$eq":
+                if value is MISSING or value != operand:
+                    return False
+            elif operator == "$ne":
+                if value is not MISSING and value == operand:
+                    return False
+            elif operator == "$in":
+                if value is MISSING or value not in operand:
+                    return False
+            elif operator == "$nin":
+                if value is not MISSING and value in operand:
+                    return False
+            elif operator == "$exists":
+                if (value is not MISSING) != bool(operand):
+                    return False
+            elif operator in COMPARISONS:
+                if value is MISSING or not COMPARISONS[operator](value, operand):
+                    return False
+            else:
+                raise NotImplementedError(f"Unsupported query operator {operator}")
+        return True
+    if value is MISSING:
+        return condition is None
+    return value == condition
+
+
+def evaluate_expression(document, expression):
+    """Evaluate the comparison subset of aggregation expressions used by $expr"""
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = get_path(document, expression[1:])
+        return None if value is MISSING else value
+    if isinstance(expression, dict) and len(expression) == 1:
+        operator, operands = next(iter(expression.items()))
+        left, right = (evaluate_expression(document, operand) for operand in operands)
+        if operator == "$eq":
+            return left == right
+        if operator == "$ne":
+            return left != right
+        if operator in COMPARISONS:
+            return COMPARISONS[operator](left, right)
+        raise NotImplementedError(f"Unsupported expression operator {operator}")
+    return expression
+
+
+def matches(document, query):
+    for key, condition in (query or {}).items():
+        if key == "$expr":
+            if not evaluate_expression(document, condition):
+                return False
+        elif key == "$and":
+            if not all(matches(document, sub_query) for sub_query in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(document, sub_query) for sub_query in condition):
+                return False
+        elif not match_condition(get_path(document, key), condition):
+            return False
+    return True
+
+
+def project(document, projection):
+    document = copy.deepcopy(document)
+    if not projection:
+        return document
+
+    include_id = projection.get("_id", 1)
+    fields = {key: value for key, value in projection.items() if key != "_id"}
+    if fields and all(fields.values()):
+        projected = {}
+        for path in fields:
+            value = get_path(document, path)
+            if value is not MISSING:
+                set_path(projected, path, value)
+    else:
+        projected = document
+        for path in fields:
+            unset_path(projected, path)
+
+    if include_id and "_id" in document:
+        projected["_id"] = document["_id"]
+    else:
+        projected.pop("_id", None)
+    return projected
+
+
+def apply_update(document, update, inserting=False):
+    for operator, fields in update.items():
+        if operator == "$set":
+            for path, value in fields.items():
+                set_path(document, path, copy.deepcopy(value))
+        elif operator == "$setOnInsert":
+            if inserting:
+                for path, value in fields.items():
+                    set_path(document, path, copy.deepcopy(value))
+        elif operator == "$inc":
+            for path, amount in fields.items():
+                current = get_path(document, path)
+                set_path(document, path, (0 if current is MISSING else current) + amount)
+        elif operator == "$unset":
+            for path in fields:
+                unset_path(document, path)
+        else:
+            raise NotImplementedError(f"Unsupported update operator {operator}")
+
+
+def sort_value(document, path):
+    # Missing fields sort before present ones, as in Mongo
+    value = get_path(document, path)
+    return (False, None) if value is MISSING else (True, value)
+
+
+class MemoryCursor:
+    def __init__(self, documents, projection):
+        self._documents = documents
+        self._projection = projection
+        self._limit = 0
+
+    def sort(self, key, direction=1):
+        keys = [(key, direction)] if isinstance(key, str) else list(key)
+        for path, order in reversed(keys):
+            self._documents.sort(key=lambda document: sort_value(document, path), reverse=order < 0)
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def __iter__(self):
+        documents = self._documents[: self._limit] if self._limit else self._documents
+        return (project(document, self._projection) for document in documents)
+
+
+class MemoryCollection:
+    """Subset of the pymongo Collection API backed by a list of dicts.
+
+    Indexes are not used for lookups, but `unique=True` indexes are enforced
+    on insert, update and upsert, raising DuplicateKeyError like Mongo.
+    """
+
+    def __init__(self, name, lock):
+        self.name = name
+        self._documents = []
+        self._unique_indexes = {}
+        self._lock = lock
+
+    def create_index(self, keys, unique=False, **kwargs):
+        fields = [(keys, 1)] if isinstance(keys, str) else keys
+        name = "_".join(f"{field}_{direction}" for field, direction in fields)
+        if unique:
+            with self._lock:
+                self._unique_indexes[name] = [field for field, _ in fields]
+                for document in self._documents:
+                    self._check_unique(document, replacing=document)
+        return name
+
+    def _check_unique(self, candidate, replacing=None):
+        for name, fields in self._unique_indexes.items():
+            # Missing fields index as null, as in Mongo
+            key = [None if get_path(candidate, field) is MISSING else get_path(candidate, field) for field in fields]
+            for document in self._documents:
+                if document is replacing:
+                    continue
+                if [None if get_path(document, field) is MISSING else get_path(document, field) for field in fields] == key:
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {name}")
+
+    def insert_one(self, document):
+        with self._lock:
+            document.setdefault("_id", uuid.uuid4().hex)
+            self._check_unique(document)
+            self._documents.append(copy.deepcopy(document))
+        return InsertOneResult(document["_id"])
+
+    def insert_many(self, documents):
+        return InsertManyResult([self.insert_one(document).inserted_id for document in documents])
+
+    def find(self, filter=None, projection=None):
+        with self._lock:
+            found = [document for document in self._documents if matches(document, filter)]
+        return MemoryCursor(found, projection)
+
+    def find_one(self, filter=None, projection=None):
+        with self._lock:
+            for document in self._documents:
+                if matches(document, filter):
+                    return project(document, projection)
+        return None
+
+    def count_documents(self, filter):
+        with self._lock:
+            return sum(1 for document in self._documents if matches(document, filter))
+
+    def _update(self, filter, update, upsert, many):
+        with self._lock:
+            matched = 0
+            for document in self._documents:
+                if matches(document, filter):
+                    updated = copy.deepcopy(document)
+                    apply_update(updated, update)
+                    self._check_unique(updated, replacing=document)
+                    document.clear()
+                    document.update(updated)
+                    matched += 1
+                    if not many:
+                        break
+
+            if matched or not upsert:
+                return UpdateResult(matched, matched)
+
+            # Seed the upserted document with the equality parts of the filter
+            document = {
+                key: value
+                for key, value in filter.items()
+                if not key.startswith("$") and not (isinstance(value, dict) and any(k.startswith("$") for k in value))
+            }
+            apply_update(document, update, inserting=True)
+            document.setdefault("_id", uuid.uuid4().hex)
+            self._check_unique(document)
+            self._documents.append(document)
+            return UpdateResult(0, 0, document["_id"])
+
+    def update_one(self, filter, update, upsert=False):
+        return self._update(filter, update, upsert, many=False)
+
+    def update_many(self, filter, update, upsert=False):
+        return self._update(filter, update, upsert, many=True)
+
+    def bulk_write(self, requests, ordered=True):
+        """Apply pymongo InsertOne/UpdateOne/UpdateMany operations in order"""
+        inserted = matched = modified = 0
+        upserted_ids = {}
+        for index, request in enumerate(requests):
+            kind = type(request).__name__
+            if kind == "InsertOne":
+                self.insert_one(request._doc)
+                inserted += 1
+            elif kind in ("UpdateOne", "UpdateMany"):
+                result = self._update(request._filter, request._doc, request._upsert, many=kind == "UpdateMany")
+                matched += result.matched_count
+                modified += result.modified_count
+                if result.upserted_id is not None:
+                    upserted_ids[index] = result.upserted_id
+            else:
+                raise NotImplementedError(f"bulk_write does not support {kind}")
+        return BulkWriteResult(inserted, matched, modified, upserted_ids)
+
+    def _delete(self, filter, many):
+        with self._lock:
+            kept, deleted = [], 0
+            for document in self._documents:
+                if (many or not deleted) and matches(document, filter):
+                    deleted += 1
+                else:
+                    kept.append(document)
+            self._documents[:] = kept
+        return DeleteResult(deleted)
+
+    def delete_one(self, filter):
+        return self._delete(filter, many=False)
+
+    def delete_many(self, filter):
+        return self._delete(filter, many=True)
+
+
+class MemoryDatabase:
+    """In-process stand-in for a pymongo Database, for offline tests and benchmarks"""
+
+    def __init__(self, name):
+        self.name = name
+        self._collections = {}
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name):
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = MemoryCollection(name, self._lock)
+            return self._collections[name]
+
+    def list_collection_names(self):
+        return list(self._collections)
@@ -0,0 +1,31 @@
+def compact_documents(items, fields):
+    """Replace repeated string values with indexes into shared lookup tables.
+
+    `fields` are dotted paths into each item (e.g. "session.location"); every
+    path gets a lookup table named after its last segment, and the value in
+    the item becomes that value's position in the table. Items are modified
+    in place.
+    """
+    lookups = {}
+    positions = {}
+
+    for path in fields:
+        name = path.split(".")[-1]
+        table = lookups.setdefault(name, [])
+        index = positions.setdefault(name, {})
+        parents, key = path.split(".")[:-1], name
+
+        for item in items:
+            container = item
+            for parent in parents:
+                container = container.get(parent) if isinstance(container, dict) else None
+            if not isinstance(container, dict) or not isinstance(container.get(key), str):
+                continue
+
+            value = container[key]
+            if value not in index:
+                index[value] = len(table)
+                table.append(value)
+            container[key] = index[value]
+
+    return {"format": "compact", "lookups": lookups, "items": items}
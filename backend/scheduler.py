@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Scheduler settings
+MAINTENANCE_INTERVAL_SECONDS = int(os.environ.get("SESSION_MAINTENANCE_INTERVAL_SECONDS", "300"))
+MAINTENANCE_BATCH_SIZE = int(os.environ.get("SESSION_MAINTENANCE_BATCH_SIZE", "500"))
+REMINDER_LEAD_HOURS = int(os.environ.get("SESSION_REMINDER_LEAD_HOURS", "24"))
+# Bookings stamped shortly before a run but committed after its query are picked up by the next one
+REMINDER_OVERLAP = timedelta(seconds=60)
+
+
+def ensure_maintenance_indexes(db):
+    """Create the indexes the maintenance jobs and event subscribers rely on"""
+    db.training_sessions.create_index([("status", 1), ("date", 1)])
+    db.training_sessions.create_index("session_id")
+    db.sessions.create_index("expires_at")
+    db.revoked_tokens.create_index("jti", unique=True)
+    db.revoked_tokens.create_index("expires_at")
+    db.bookings.create_index([("session_id", 1), ("status", 1)])
+    db.notifications.create_index("booking_id", unique=True)
+    db.analytics_events.create_index("event_id", unique=True)
+
+
+def complete_past_sessions(db, batch_size=MAINTENANCE_BATCH_SIZE):
+    """Move active training sessions whose date has passed to `completed`"""
+    today = datetime.now().strftime("%Y-%m-%d")
+    completed = 0
+
+    while True:
+        batch = [
+            doc["session_id"]
+            for doc in db.training_sessions.find(
+                {"status": "active", "date": {"$lt": today}},
+                {"session_id": 1, "_id": 0},
+            ).limit(batch_size)
+        ]
+        if not batch:
+            break
+
+        result = db.training_sessions.update_many(
+            {"session_id": {"$in": batch}, "status": "active"},
+            {"$set": {"status": "completed", "completed_at": datetime.now()}},
+        )
+        completed += result.modified_count
+
+        if len(batch) < batch_size:
+            break
+
+    return completed
+
+
+def purge_expired_tokens(db, batch_size=MAINTENANCE_BATCH_SIZE):
+    """Delete session tokens and token revocations whose `expires_at` is in the past"""
+    now = datetime.now()
+    purged = 0
+
+    # A revoked signed token is rejected by its own expiry once it has passed
+    db.revoked_tokens.delete_many({"expires_at": {"$lt": now}})
+
+    while True:
+        batch = [
+            doc["_id"]
+            for doc in db.sessions.find({"expires_at": {"$lt": now}}, {"_id": 1}).limit(batch_size)
+        ]
+        if not batch:
+            break
+
+        result = db.sessions.delete_many({"_id": {"$in": batch}})
+        purged += result.deleted_count
+
+        if len(batch) < batch_size:
+            break
+
+    return purged
+
+
+def queue_session_reminders(db, since=None, lead_hours=REMINDER_LEAD_HOURS, batch_size=MAINTENANCE_BATCH_SIZE):
+    """Queue reminder notifications for confirmed bookings of upcoming sessions.
+
+    `since` is when the previous run started. Only bookings made after it,
+    plus every booking of sessions that entered the lead window after it,
+    are considered; without it all bookings of upcoming sessions are.
+    Reminders are upserted in unordered bulk writes of `batch_size`.
+    """
+    # Imported here so the server module loads without pymongo
+    from pymongo import UpdateOne
+
+    now = datetime.now()
+    today = now.strftime("%Y-%m-%d")
+    horizon = (now + timedelta(hours=lead_hours)).strftime("%Y-%m-%d")
+    queued = 0
+
+    upcoming = {
+        training_session["session_id"]: training_session
+        for training_session in db.training_sessions.find(
+            {"status": "active", "date": {"$gte": today, "$lte": horizon}},
+            {"session_id": 1, "title": 1, "date": 1, "time": 1, "_id": 0},
+        )
+    }
+    if not upcoming:
+        return 0
+
+    booking_filter = {"session_id": {"$in": list(upcoming)}, "status": "confirmed"}
+    if since is not None:
+        since = since - REMINDER_OVERLAP
+        previous_horizon = (since + timedelta(hours=lead_hours)).strftime("%Y-%m-%d")
+        newly_upcoming = [
+            session_id for session_id, training_session in upcoming.items()
+            if training_session["date"] > previous_horizon
+        ]
+        booking_filter["$or"] = [
+            {"booking_date": {"$gte": since.isoformat()}},
+            {"session_id": {"$in": newly_upcoming}},
+        ]
+
+    bookings = db.bookings.find(booking_filter, {"booking_id": 1, "session_id": 1, "student_id": 1, "_id": 0})
+    batch = []
+    for booking in bookings:
+        training_session = upcoming[booking["session_id"]]
+        # Upsert on booking_id so overlapping runs never queue a reminder twice
+        batch.append(UpdateOne(
+            {"booking_id": booking["booking_id"]},
+            {
+                "$setOnInsert": {
+                    "notification_id": str(uuid.uuid4()),
+                    "user_id": booking["student_id"],
+                    "session_id": booking["session_id"],
+                    "type": "session_reminder",
+                    "title": training_session["title"],
+                    "date": training_session["date"],
+                    "time": training_session["time"],
+                    "status": "queued",
+                    "created_at": now,
+                }
+            },
+            upsert=True,
+        ))
+        if len(batch) >= batch_size:
+            queued += db.notifications.bulk_write(batch, ordered=False).upserted_count
+            batch = []
+
+    if batch:
+        queued += db.notifications.bulk_write(batch, ordered=False).upserted_count
+    return queued
+
+
+class SessionMaintenanceScheduler:
+    """Runs the session maintenance jobs periodically inside the app process.
+
+    Each job uses the blocking pymongo client, so runs are dispatched to a
+    worker thread and never hold up the event loop serving requests.
+    """
+
+    def __init__(self, db, interval_seconds=MAINTENANCE_INTERVAL_SECONDS, batch_size=MAINTENANCE_BATCH_SIZE):
+        self.db = db
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.last_run = None
+        self._last_started_at = None
+        self._task = None
+
+    @property
+    def enabled(self):
+        return self.interval_seconds > 0
+
+    def run_once(self):
+        started_at = datetime.now()
+        results = {
+            "completed_sessions": complete_past_sessions(self.db, self.batch_size),
+            "purged_tokens": purge_expired_tokens(self.db, self.batch_size),
+            "queued_reminders": queue_session_reminders(self.db, since=self._last_started_at, batch_size=self.batch_size),
+        }
+        self._last_started_at = started_at
+        self.last_run = {"started_at": started_at, "finished_at": datetime.now(), **results}
+        return results
+
+    async def _loop(self):
+        try:
+            await asyncio.to_thread(ensure_maintenance_indexes, self.db)
+        except Exception:
+            logger.exception("Could not create session maintenance indexes")
+
+        while True:
+            try:
+                results = await asyncio.to_thread(self.run_once)
+                logger.info("Session maintenance finished: %s", results)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Session maintenance run failed")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        if not self.enabled or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -1,30 +1,104 @@
-from fastapi import FastAPI, HTTPException, Depends, Request, Response
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, Body
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pymongo import MongoClient
-from bson import ObjectId
 import os
 from datetime import datetime, timedelta
 import uuid
-from typing import Optional, List
-import requests
+from typing import Optional, List, Literal
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
+import asyncio
+import anyio.to_thread
+from database import Database
+from auth_provider import get_auth_provider
+from scheduler import SessionMaintenanceScheduler
+from user_cache import UserCache
+from diagnostics import current_route, slow_query_log
+from compression import CompressionMiddleware
+from payloads import compact_documents
+from events import EVENT_SOURCE, EventBus, ChangeStreamTailer
+from stats import StatsCache
+from admission import ADMISSION_ENABLED, AdmissionController, AdmissionMiddleware
+from tokens import InvalidSessionToken, RevocationList, SessionTokenService
 
-app = FastAPI(title="AIGA Connect API", version="1.0.0")
+# MongoDB connection (the client is created in the app lifespan)
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017/')
+db = Database(MONGO_URL, "aiga_connect")
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# OAuth session-data provider (Emergent Auth, or a stub for offline runs)
+auth_provider = get_auth_provider()
 
-# MongoDB connection
-MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017/')
-client = MongoClient(MONGO_URL)
-db = client.aiga_connect
+# Session tokens (opaque uuid or locally verifiable signed tokens)
+revocation_list = RevocationList(db)
+session_tokens = SessionTokenService(revocation_list)
+
+# User profile/role cache
+user_cache = UserCache(db)
+
+# Cached /api/stats counts
+stats_cache = StatsCache(db)
+
+# Background maintenance
+maintenance_scheduler = SessionMaintenanceScheduler(db)
+
+# Domain events, processed off the request path
+event_bus = EventBus()
+change_stream_tailer = ChangeStreamTailer(db, event_bus)
+
+def publish_event(event_type, data):
+    # With the change-stream source the tailer emits insert events instead
+    if EVENT_SOURCE == "inline":
+        event_bus.publish(event_type, data)
+
+def record_analytics(events):
+    # Keep only identifiers, never profile data
+    id_fields = ("user_id", "coach_id", "student_id", "session_id", "booking_id")
+    for event in events:
+        # Upsert on event_id: with the change-stream source every worker receives the same event
+        db.analytics_events.update_one(
+            {"event_id": event["event_id"]},
+            {
+                "$setOnInsert": {
+                    "event_id": event["event_id"],
+                    "type": event["type"],
+                    "occurred_at": event["occurred_at"],
+                    "refs": {field: event["data"][field] for field in id_fields if field in event["data"]}
+                }
+            },
+            upsert=True,
+        )
+
+event_bus.subscribe("stats", ["user.created", "training_session.created", "booking.created"], stats_cache.invalidate)
+event_bus.subscribe("analytics", ["*"], record_analytics)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    db.connect()
+    # One booking per student and session; create_booking relies on it under concurrency
+    await asyncio.to_thread(db.bookings.create_index, [("session_id", 1), ("student_id", 1)], unique=True)
+    # Blocking handlers run in the threadpool; give every admitted request a thread
+    if app.state.admission is not None:
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        limiter.total_tokens = max(limiter.total_tokens, app.state.admission.concurrency)
+    event_bus.start()
+    if session_tokens.keys:
+        # Load revocations before serving, so logged-out tokens are rejected from the first request
+        await asyncio.to_thread(revocation_list.sync)
+        revocation_list.start()
+    if EVENT_SOURCE == "changestream":
+        change_stream_tailer.start()
+    # Start background session maintenance (expiry, token purge, reminders)
+    maintenance_scheduler.start()
+    yield
+    await maintenance_scheduler.stop()
+    await change_stream_tailer.stop()
+    await event_bus.stop()
+    await revocation_list.stop()
+    db.close()
+    user_cache.clear()
+    stats_cache.invalidate()
+
+router = APIRouter()
 
 # Security
 security = HTTPBearer()
@@ -41,7 +115,8 @@ class UserRegistration(BaseModel):
     goals: str
     medical_conditions: Optional[str] = None
     emergency_contact: str
-    role: str = "student"  # student, coach, parent
+    # Self-service roles only; admin is granted directly in the users collection
+    role: Literal["student", "coach", "parent"] = "student"
 
 class TrainingSession(BaseModel):
     title: str
@@ -60,11 +135,27 @@ class Booking(BaseModel):
     student_id: str
     booking_date: str
 
+# Handlers and dependencies that call pymongo are plain `def`, so FastAPI runs
+# them in its threadpool and a slow query never blocks the event loop
+
 # Auth functions
-async def verify_session_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def verify_session_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
     
-    # Check if token exists in sessions
+    # Signed tokens are verified locally, without a database lookup
+    if session_tokens.is_signed(token):
+        try:
+            claims = session_tokens.verify(token)
+        except InvalidSessionToken as e:
+            raise HTTPException(status_code=401, detail=e.detail)
+        return {
+            "session_token": token,
+            "user_id": claims["sub"],
+            "expires_at": datetime.fromtimestamp(claims["exp"]),
+            "claims": claims
+        }
+    
+    # Opaque tokens (including ones issued before signed tokens): check sessions
     session = db.sessions.find_one({"session_token": token})
     if not session:
         raise HTTPException(status_code=401, detail="Invalid session token")
@@ -75,36 +166,32 @@ async def verify_session_token(credentials: HTTPAuthorizationCredentials = Depen
     
     return session
 
-@app.get("/")
+@router.get("/")
 async def root():
     return {"message": "AIGA Connect API", "status": "active"}
 
-@app.get("/api/auth/login")
+@router.get("/api/auth/login")
 async def login():
     # Redirect to Emergent Auth
     preview_url = "https://b14b3b75-ada1-472a-b369-78b0a2ae9404.preview.emergentagent.com"
     return {"auth_url": f"https://auth.emergentagent.com/?redirect={preview_url}/profile"}
 
-@app.post("/api/auth/session")
-async def create_session(request: Request):
-    data = await request.json()
+@router.post("/api/auth/session")
+def create_session(data: dict = Body(...)):
     session_id = data.get("session_id")
     
     if not session_id:
         raise HTTPException(status_code=400, detail="Session ID required")
     
-    # Call Emergent Auth API
-    headers = {"X-Session-ID": session_id}
-    response = requests.get("https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data", headers=headers)
+    # Resolve the OAuth session with the auth provider
+    user_data = auth_provider.get_session_data(session_id)
     
-    if response.status_code != 200:
+    if user_data is None:
         raise HTTPException(status_code=401, detail="Invalid session")
     
-    user_data = response.json()
-    
     # Create/update user in database
     user_filter = {"email": user_data["email"]}
-    existing_user = db.users.find_one(user_filter)
+    existing_user = db.users.find_one(user_filter, {"user_id": 1, "_id": 0})
     
     if not existing_user:
         new_user = {
@@ -116,19 +203,24 @@ async def create_session(request: Request):
             "profile_completed": False
         }
         db.users.insert_one(new_user)
+        new_user.pop("_id", None)
+        publish_event("user.created", new_user)
         user_id = new_user["user_id"]
     else:
         user_id = existing_user["user_id"]
     
     # Create session token
-    session_token = str(uuid.uuid4())
-    session_record = {
-        "session_token": session_token,
-        "user_id": user_id,
-        "expires_at": datetime.now() + timedelta(days=7),
-        "created_at": datetime.now()
-    }
-    db.sessions.insert_one(session_record)
+    if session_tokens.issues_signed:
+        session_token, _ = session_tokens.issue(user_id)
+    else:
+        session_token = str(uuid.uuid4())
+        session_record = {
+            "session_token": session_token,
+            "user_id": user_id,
+            "expires_at": datetime.now() + timedelta(days=7),
+            "created_at": datetime.now()
+        }
+        db.sessions.insert_one(session_record)
     
     return {
         "session_token": session_token,
@@ -140,8 +232,18 @@ async def create_session(request: Request):
         }
     }
 
-@app.post("/api/users/complete-profile")
-async def complete_profile(profile: UserRegistration, session: dict = Depends(verify_session_token)):
+@router.post("/api/auth/logout")
+def logout(session: dict = Depends(verify_session_token)):
+    if "claims" in session:
+        # Signed tokens stay valid until expiry unless revoked
+        session_tokens.revoke(session["claims"])
+    else:
+        db.sessions.delete_one({"session_token": session["session_token"]})
+    
+    return {"message": "Вы вышли из системы"}
+
+@router.post("/api/users/complete-profile")
+def complete_profile(profile: UserRegistration, session: dict = Depends(verify_session_token)):
     user_id = session["user_id"]
     
     profile_data = {
@@ -164,28 +266,26 @@ async def complete_profile(profile: UserRegistration, session: dict = Depends(ve
         {"user_id": user_id},
         {"$set": profile_data}
     )
+    user_cache.invalidate(user_id)
     
     return {"message": "Профиль успешно завершен"}
 
-@app.get("/api/users/profile")
-async def get_profile(session: dict = Depends(verify_session_token)):
+@router.get("/api/users/profile")
+def get_profile(session: dict = Depends(verify_session_token)):
     user_id = session["user_id"]
-    user = db.users.find_one({"user_id": user_id})
+    user = user_cache.get_profile(user_id)
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Remove MongoDB ObjectId from response
-    user.pop("_id", None)
     return user
 
-@app.post("/api/training-sessions")
-async def create_training_session(session_data: TrainingSession, session: dict = Depends(verify_session_token)):
+@router.post("/api/training-sessions")
+def create_training_session(session_data: TrainingSession, session: dict = Depends(verify_session_token)):
     user_id = session["user_id"]
     
-    # Check if user is a coach
-    user = db.users.find_one({"user_id": user_id})
-    if not user or user.get("role") != "coach":
+    # Check if user is allowed to create sessions (coaches only)
+    if not user_cache.has_permission(user_id, "training_sessions:create"):
         raise HTTPException(status_code=403, detail="Only coaches can create training sessions")
     
     session_record = {
@@ -208,40 +308,41 @@ async def create_training_session(session_data: TrainingSession, session: dict =
     
     db.training_sessions.insert_one(session_record)
     session_record.pop("_id", None)
+    publish_event("training_session.created", session_record)
     return session_record
 
-@app.get("/api/training-sessions")
-async def get_training_sessions():
-    sessions = list(db.training_sessions.find({"status": "active"}))
+@router.get("/api/training-sessions")
+def get_training_sessions(compact: bool = False):
+    # Leave out MongoDB ObjectId
+    sessions = list(db.training_sessions.find({"status": "active"}, {"_id": 0}))
     
-    # Remove MongoDB ObjectId and convert to list
-    for session in sessions:
-        session.pop("_id", None)
+    # Optionally move repeated coach/location strings into lookup tables
+    if compact:
+        return compact_documents(sessions, ["coach_name", "location"])
     
     return sessions
 
-@app.post("/api/bookings")
-async def create_booking(booking: Booking, session: dict = Depends(verify_session_token)):
+@router.post("/api/bookings")
+def create_booking(booking: Booking, session: dict = Depends(verify_session_token)):
     user_id = session["user_id"]
     
-    # Check if session exists and has capacity
-    training_session = db.training_sessions.find_one({"session_id": booking.session_id})
+    # Imported here so the server module loads without pymongo
+    from pymongo.errors import DuplicateKeyError
+    
+    # Check if session exists
+    training_session = db.training_sessions.find_one({"session_id": booking.session_id}, {"_id": 0, "session_id": 1})
     if not training_session:
         raise HTTPException(status_code=404, detail="Training session not found")
     
-    if training_session["current_participants"] >= training_session["max_participants"]:
+    # Reserve a seat atomically, so concurrent bookings can never overbook the session
+    reserved = db.training_sessions.update_one(
+        {"session_id": booking.session_id, "$expr": {"$lt": ["$current_participants", "$max_participants"]}},
+        {"$inc": {"current_participants": 1}}
+    )
+    if reserved.matched_count == 0:
         raise HTTPException(status_code=400, detail="Session is full")
     
-    # Check if user already booked this session
-    existing_booking = db.bookings.find_one({
-        "session_id": booking.session_id,
-        "student_id": user_id
-    })
-    
-    if existing_booking:
-        raise HTTPException(status_code=400, detail="Already booked this session")
-    
-    # Create booking
+    # Create booking (unique on session_id + student_id)
     booking_record = {
         "booking_id": str(uuid.uuid4()),
         "session_id": booking.session_id,
@@ -250,27 +351,35 @@ async def create_booking(booking: Booking, session: dict = Depends(verify_sessio
         "status": "confirmed"
     }
     
-    db.bookings.insert_one(booking_record)
-    
-    # Update session participant count
-    db.training_sessions.update_one(
-        {"session_id": booking.session_id},
-        {"$inc": {"current_participants": 1}}
-    )
+    try:
+        db.bookings.insert_one(booking_record)
+    except Exception as e:
+        # Give the seat back if the booking could not be stored
+        db.training_sessions.update_one(
+            {"session_id": booking.session_id},
+            {"$inc": {"current_participants": -1}}
+        )
+        if isinstance(e, DuplicateKeyError):
+            raise HTTPException(status_code=400, detail="Already booked this session")
+        raise
     
     booking_record.pop("_id", None)
+    publish_event("booking.created", booking_record)
     return booking_record
 
-@app.get("/api/bookings/my")
-async def get_my_bookings(session: dict = Depends(verify_session_token)):
+@router.get("/api/bookings/my")
+def get_my_bookings(compact: bool = False, session: dict = Depends(verify_session_token)):
     user_id = session["user_id"]
     
     # Get user's bookings with session details
-    bookings = list(db.bookings.find({"student_id": user_id}))
+    bookings = list(db.bookings.find({"student_id": user_id}, {"_id": 0}))
     
     booking_details = []
     for booking in bookings:
-        training_session = db.training_sessions.find_one({"session_id": booking["session_id"]})
+        training_session = db.training_sessions.find_one(
+            {"session_id": booking["session_id"]},
+            {"_id": 0, "title": 1, "date": 1, "time": 1, "coach_name": 1, "location": 1, "price": 1}
+        )
         if training_session:
             booking_detail = {
                 "booking_id": booking["booking_id"],
@@ -288,20 +397,78 @@ async def get_my_bookings(session: dict = Depends(verify_session_token)):
             }
             booking_details.append(booking_detail)
     
+    # Optionally move repeated coach/location strings into lookup tables
+    if compact:
+        return compact_documents(booking_details, ["session.coach_name", "session.location"])
+    
     return booking_details
 
-@app.get("/api/stats")
-async def get_stats():
-    total_users = db.users.count_documents({})
-    total_sessions = db.training_sessions.count_documents({"status": "active"})
-    total_bookings = db.bookings.count_documents({})
+@router.get("/api/stats")
+def get_stats():
+    return stats_cache.get()
+
+@router.get("/api/admin/slow-queries")
+def get_slow_queries(limit: int = 10, explain: bool = False, session: dict = Depends(verify_session_token)):
+    if not user_cache.has_permission(session["user_id"], "diagnostics:read"):
+        raise HTTPException(status_code=403, detail="Admin access required")
     
     return {
-        "total_users": total_users,
-        "total_sessions": total_sessions,
-        "total_bookings": total_bookings
+        "threshold_ms": slow_query_log.threshold_ms,
+        "offenders": slow_query_log.top_offenders(limit=limit, explain=explain)
     }
 
+@router.get("/api/admin/admission")
+def get_admission_stats(request: Request, session: dict = Depends(verify_session_token)):
+    if not user_cache.has_permission(session["user_id"], "diagnostics:read"):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    admission = request.app.state.admission
+    return {
+        "enabled": admission is not None,
+        "route_classes": admission.stats() if admission is not None else {}
+    }
+
+# Tag Mongo operations with the route that issued them (slow-query log)
+async def track_route(request: Request, call_next):
+    token = current_route.set(f"{request.method} {request.url.path}")
+    try:
+        return await call_next(request)
+    finally:
+        current_route.reset(token)
+
+def create_app() -> FastAPI:
+    """Build the ASGI app (`uvicorn --factory server:create_app`).
+
+    Only one app per process is supported: the database handle, caches,
+    event bus and background jobs are module-level singletons shared by
+    every app built here, and `server.app` is already built at import.
+    Use `server.app` rather than calling this again in the same process.
+    """
+    app = FastAPI(title="AIGA Connect API", version="1.0.0", lifespan=lifespan)
+    
+    # Per route class concurrency limits with load shedding (inside CORS so 503s keep CORS headers)
+    app.state.admission = AdmissionController() if ADMISSION_ENABLED else None
+    if app.state.admission is not None:
+        app.add_middleware(AdmissionMiddleware, controller=app.state.admission)
+    
+    # CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.middleware("http")(track_route)
+    
+    # Negotiated brotli/gzip compression for responses above a size threshold
+    app.add_middleware(CompressionMiddleware)
+    
+    app.include_router(router)
+    return app
+
+app = create_app()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
@@ -0,0 +1,47 @@
+import os
+import threading
+import time
+
+# Stats cache settings
+STATS_CACHE_TTL_SECONDS = float(os.environ.get("STATS_CACHE_TTL_SECONDS", "60"))
+
+
+class StatsCache:
+    """Caches the /api/stats counts until a write event or the TTL makes them stale.
+
+    Writes reach the cache through the event bus (see `invalidate`), so the
+    request that made the write does not pay for recounting. The TTL covers
+    changes that emit no event, such as the maintenance scheduler
+    completing past sessions.
+    """
+
+    def __init__(self, db, ttl_seconds=STATS_CACHE_TTL_SECONDS):
+        self.db = db
+        self.ttl_seconds = ttl_seconds
+        self._stats = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._stats is not None and time.monotonic() < self._expires_at:
+                return dict(self._stats)
+            generation = self._generation
+
+        stats = {
+            "total_users": self.db.users.count_documents({}),
+            "total_sessions": self.db.training_sessions.count_documents({"status": "active"}),
+            "total_bookings": self.db.bookings.count_documents({}),
+        }
+        with self._lock:
+            # An invalidation during the counts may have missed the write; don't cache them
+            if generation == self._generation:
+                self._stats = stats
+                self._expires_at = time.monotonic() + self.ttl_seconds
+        return dict(stats)
+
+    def invalidate(self, events=None):
+        with self._lock:
+            self._generation += 1
+            self._stats = None
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Session token settings
+SESSION_TOKEN_FORMAT = os.environ.get("SESSION_TOKEN_FORMAT", "opaque")  # opaque, signed
+# Comma separated "kid:secret" pairs; the first key signs, all of them verify.
+# Rotate by prepending a new key and dropping the old one after SESSION_TTL_DAYS.
+SESSION_SIGNING_KEYS = os.environ.get("SESSION_SIGNING_KEYS", "")
+SESSION_TTL_DAYS = int(os.environ.get("SESSION_TTL_DAYS", "7"))
+REVOCATION_SYNC_SECONDS = float(os.environ.get("REVOCATION_SYNC_SECONDS", "5"))
+
+SIGNING_ALGORITHM = "HS256"
+
+
+class InvalidSessionToken(Exception):
+    """Raised when a signed token is malformed, forged, expired or revoked"""
+
+    def __init__(self, detail):
+        super().__init__(detail)
+        self.detail = detail
+
+
+def parse_signing_keys(value):
+    keys = {}
+    for pair in value.split(","):
+        pair = pair.strip()
+        if not pair:
+            continue
+        kid, _, secret = pair.partition(":")
+        if not kid or not secret:
+            raise ValueError("SESSION_SIGNING_KEYS entries must look like kid:secret")
+        keys[kid] = secret
+    return keys
+
+
+class RevocationList:
+    """Token ids (`jti`) revoked before their expiry, shared through Mongo.
+
+    Each worker keeps an in-memory copy holding only revocations that have
+    not expired yet, and reloads every unexpired entry of `revoked_tokens`
+    every REVOCATION_SYNC_SECONDS, so checking a token never touches the
+    database and a revocation reaches every worker within one sync.
+    """
+
+    def __init__(self, db, sync_seconds=REVOCATION_SYNC_SECONDS):
+        self.db = db
+        self.sync_seconds = sync_seconds
+        self._revoked = {}
+        self._lock = threading.Lock()
+        self._task = None
+
+    def is_revoked(self, jti):
+        with self._lock:
+            return jti in self._revoked
+
+    def revoke(self, jti, expires_at):
+        with self._lock:
+            self._revoked[jti] = expires_at
+        self.db.revoked_tokens.update_one(
+            {"jti": jti},
+            {"$setOnInsert": {"jti": jti, "expires_at": expires_at, "revoked_at": datetime.now()}},
+            upsert=True,
+        )
+
+    def sync(self):
+        """Reload all unexpired revocations, including other workers' ones"""
+        now = datetime.now()
+        # A full reload, since revoked_at stamps from other workers can arrive out of order
+        entries = self.db.revoked_tokens.find({"expires_at": {"$gt": now}}, {"_id": 0, "jti": 1, "expires_at": 1})
+        revoked = {entry["jti"]: entry["expires_at"] for entry in entries}
+        with self._lock:
+            # Keep local revocations whose write landed after the query ran
+            for jti, expires_at in self._revoked.items():
+                if expires_at > now:
+                    revoked.setdefault(jti, expires_at)
+            self._revoked = revoked
+
+    def __len__(self):
+        return len(self._revoked)
+
+    async def _loop(self):
+        # The app lifespan runs the first sync before serving requests
+        while True:
+            await asyncio.sleep(self.sync_seconds)
+            try:
+                await asyncio.to_thread(self.sync)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Revocation list sync failed")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+class SessionTokenService:
+    """Issues and verifies session tokens.
+
+    With SESSION_TOKEN_FORMAT=signed, new tokens are JWTs carrying `sub`
+    (user_id), `exp` and `jti`, signed with the active key and verified
+    locally. Opaque uuid tokens issued before the switch are still accepted;
+    callers look those up in `sessions` as before.
+    """
+
+    def __init__(self, revocations, token_format=SESSION_TOKEN_FORMAT, signing_keys=SESSION_SIGNING_KEYS, ttl_days=SESSION_TTL_DAYS):
+        if token_format not in ("opaque", "signed"):
+            raise ValueError(f"Unknown SESSION_TOKEN_FORMAT {token_format!r}")
+        self.token_format = token_format
+        self.keys = parse_signing_keys(signing_keys)
+        if token_format == "signed" and not self.keys:
+            raise ValueError("SESSION_TOKEN_FORMAT=signed requires SESSION_SIGNING_KEYS")
+        self.active_kid = next(iter(self.keys), None)
+        self.ttl = timedelta(days=ttl_days)
+        self.revocations = revocations
+
+    @property
+    def issues_signed(self):
+        return self.token_format == "signed"
+
+    def is_signed(self, token):
+        # uuid4 tokens never contain dots, JWTs always have exactly two
+        return bool(self.keys) and token.count(".") == 2
+
+    def issue(self, user_id):
+        """Return a new signed token for `user_id` and its expiry"""
+        import jwt
+
+        expires_at = datetime.now() + self.ttl
+        claims = {
+            "sub": user_id,
+            "jti": uuid.uuid4().hex,
+            "iat": int(time.time()),
+            "exp": int(time.time() + self.ttl.total_seconds()),
+        }
+        token = jwt.encode(claims, self.keys[self.active_kid], algorithm=SIGNING_ALGORITHM, headers={"kid": self.active_kid})
+        return token, expires_at
+
+    def verify(self, token):
+        """Return the claims of a valid signed token, or raise InvalidSessionToken"""
+        import jwt
+
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except jwt.InvalidTokenError:
+            raise InvalidSessionToken("Invalid session token")
+        if kid not in self.keys:
+            raise InvalidSessionToken("Invalid session token")
+
+        try:
+            claims = jwt.decode(
+                token,
+                self.keys[kid],
+                algorithms=[SIGNING_ALGORITHM],
+                options={"require": ["sub", "exp", "jti"]},
+            )
+        except jwt.ExpiredSignatureError:
+            raise InvalidSessionToken("Session expired")
+        except jwt.InvalidTokenError:
+            raise InvalidSessionToken("Invalid session token")
+
+        if self.revocations.is_revoked(claims["jti"]):
+            raise InvalidSessionToken("Invalid session token")
+        return claims
+
+    def revoke(self, claims):
+        self.revocations.revoke(claims["jti"], datetime.fromtimestamp(claims["exp"]))
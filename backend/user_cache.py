@@ -0,0 +1,105 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Cache settings. Invalidation is per process, so another worker can serve
+# a stale entry for up to USER_CACHE_TTL_SECONDS after a profile update.
+USER_CACHE_TTL_SECONDS = float(os.environ.get("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_MAX_ENTRIES = int(os.environ.get("USER_CACHE_MAX_ENTRIES", "10000"))
+
+# The profile endpoint returns the whole user document except the ObjectId
+PROFILE_PROJECTION = {"_id": 0}
+
+# Fields needed for role/permission checks
+ROLE_PROJECTION = {"_id": 0, "user_id": 1, "role": 1, "profile_completed": 1}
+
+# Permissions granted to each role. "admin" cannot be chosen through
+# complete-profile; it is only ever set directly in the users collection.
+ROLE_PERMISSIONS = {
+    "coach": {"training_sessions:create"},
+    "admin": {"training_sessions:create", "diagnostics:read"},
+}
+
+
+class UserCache:
+    """In-process LRU cache of user documents keyed by `user_id`.
+
+    Entries remember which fields they were loaded with, so a cached
+    profile also answers role lookups while a role-only entry is reloaded
+    the first time the full profile is requested. Writers call
+    `invalidate` after updating a user so the next read in this process
+    goes to Mongo. Other workers only notice once their entry expires, so
+    a denied permission check is always re-read from Mongo: a user who was
+    just promoted to coach is never refused because of a stale role.
+    """
+
+    def __init__(self, db, ttl_seconds=USER_CACHE_TTL_SECONDS, max_entries=USER_CACHE_MAX_ENTRIES):
+        self.db = db
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_entry(self, user_id, fields):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, cached_fields, document = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            # `None` stands for the whole document
+            if cached_fields is not None and (fields is None or not fields <= cached_fields):
+                return None
+            self._entries.move_to_end(user_id)
+            return document
+
+    def _put_entry(self, user_id, fields, document):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, fields, document)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _load(self, user_id, projection, refresh=False):
+        included = frozenset(key for key, value in projection.items() if value)
+        fields = included or None
+        if not refresh:
+            document = self._get_entry(user_id, fields)
+            if document is not None:
+                self.hits += 1
+                return document
+
+        self.misses += 1
+        document = self.db.users.find_one({"user_id": user_id}, projection)
+        if document is not None:
+            self._put_entry(user_id, fields, document)
+        return document
+
+    def get_profile(self, user_id):
+        """Return the user's profile fields, or None if the user does not exist"""
+        document = self._load(user_id, PROFILE_PROJECTION)
+        return dict(document) if document is not None else None
+
+    def get_role(self, user_id, refresh=False):
+        """Return the user's role, or None if the user does not exist"""
+        document = self._load(user_id, ROLE_PROJECTION, refresh=refresh)
+        return document.get("role") if document is not None else None
+
+    def has_permission(self, user_id, permission):
+        if permission in ROLE_PERMISSIONS.get(self.get_role(user_id), set()):
+            return True
+        # The cached role may predate a profile update made on another worker
+        return permission in ROLE_PERMISSIONS.get(self.get_role(user_id, refresh=True), set())
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Run the backend fully offline: in-memory storage, stub auth, no background jobs
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("AUTH_BACKEND", "stub")
+os.environ.setdefault("SESSION_MAINTENANCE_INTERVAL_SECONDS", "0")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
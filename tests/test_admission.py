@@ -0,0 +1,228 @@
+import asyncio
+import threading
+import time
+
+import anyio.to_thread
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import server
+from admission import AdmissionController, AdmissionMiddleware, classify
+
+SLOW_WRITE_SECONDS = 1.0
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.01)
+
+
+def test_threadpool_fits_every_admitted_request():
+    with TestClient(server.app) as client:
+        total_tokens = client.portal.call(lambda: anyio.to_thread.current_default_thread_limiter().total_tokens)
+
+    assert total_tokens >= server.app.state.admission.concurrency
+
+
+def test_saturated_writes_do_not_delay_reads(monkeypatch):
+    writes = server.app.state.admission.limiters["writes"]
+
+    with TestClient(server.app) as client:
+        response = client.post("/api/auth/session", json={"session_id": "stub:busy@aiga.kz"})
+        headers = {"Authorization": f"Bearer {response.json()['session_token']}"}
+
+        # Every booking spends a second in a blocking Mongo call
+        training_sessions = server.db.training_sessions
+        find_one = training_sessions.find_one
+
+        def slow_find_one(*args, **kwargs):
+            time.sleep(SLOW_WRITE_SECONDS)
+            return find_one(*args, **kwargs)
+
+        monkeypatch.setattr(training_sessions, "find_one", slow_find_one)
+
+        def book():
+            client.post("/api/bookings", json={"session_id": "missing", "student_id": "", "booking_date": ""}, headers=headers)
+
+        threads = [threading.Thread(target=book) for _ in range(writes.concurrency)]
+        for thread in threads:
+            thread.start()
+        try:
+            wait_for(lambda: writes.in_flight == writes.concurrency)
+
+            started = time.perf_counter()
+            response = client.get("/api/training-sessions")
+            elapsed = time.perf_counter() - started
+            still_saturated = writes.in_flight == writes.concurrency
+        finally:
+            for thread in threads:
+                thread.join()
+
+    assert response.status_code == 200
+    assert still_saturated
+    assert elapsed < SLOW_WRITE_SECONDS / 4
+
+
+async def hold(request):
+    await asyncio.sleep(float(request.query_params.get("hold", "0")))
+    return JSONResponse({"ok": True})
+
+
+def make_app(limits, queue_timeout_seconds=2.0):
+    controller = AdmissionController(limits, queue_timeout_seconds=queue_timeout_seconds)
+    app = Starlette(routes=[Route("/", hold), Route("/api/{path:path}", hold, methods=["GET", "POST"])])
+    return AdmissionMiddleware(app, controller), controller
+
+
+def send_concurrently(app, requests):
+    async def send_all():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await asyncio.gather(*(client.request(method, path) for method, path in requests))
+
+    return asyncio.run(send_all())
+
+
+LIMITS = {"auth": (1, 0), "reads": (1, 0), "writes": (1, 0)}
+
+
+@pytest.mark.parametrize("method, path, route_class", [
+    ("POST", "/api/auth/session", "auth"),
+    ("POST", "/api/auth/logout", "auth"),
+    ("GET", "/api/training-sessions", "reads"),
+    ("GET", "/api/bookings/my", "reads"),
+    ("POST", "/api/bookings", "writes"),
+    ("DELETE", "/api/bookings/b1", "writes"),
+    ("GET", "/", None),
+    ("GET", "/api/admin/slow-queries", None),
+])
+def test_classify(method, path, route_class):
+    assert classify(method, path) == route_class
+
+
+def test_full_queue_is_shed_with_retry_after():
+    app, controller = make_app(LIMITS)
+
+    responses = send_concurrently(app, [("POST", "/api/bookings?hold=0.2")] * 2)
+
+    assert sorted(response.status_code for response in responses) == [200, 503]
+    shed = next(response for response in responses if response.status_code == 503)
+    assert shed.headers["retry-after"] == "1"
+    assert controller.limiters["writes"].stats()["shed_queue_full"] == 1
+
+
+def test_queued_request_is_shed_after_the_deadline():
+    app, controller = make_app({"writes": (1, 1)}, queue_timeout_seconds=0.05)
+
+    responses = send_concurrently(app, [("POST", "/api/bookings?hold=0.3")] * 2)
+
+    assert sorted(response.status_code for response in responses) == [200, 503]
+    stats = controller.limiters["writes"].stats()
+    assert stats["shed_deadline"] == 1
+    assert stats["shed_queue_full"] == 0
+
+
+def test_queued_request_runs_once_a_slot_frees_up():
+    app, controller = make_app({"writes": (1, 1)}, queue_timeout_seconds=1.0)
+
+    responses = send_concurrently(app, [("POST", "/api/bookings?hold=0.05")] * 2)
+
+    assert [response.status_code for response in responses] == [200, 200]
+    assert controller.limiters["writes"].stats()["admitted"] == 2
+
+
+def test_root_and_admin_paths_are_exempt():
+    app, controller = make_app(LIMITS)
+
+    responses = send_concurrently(app, [("GET", "/?hold=0.1")] * 3 + [("GET", "/api/admin/admission?hold=0.1")] * 3)
+
+    assert [response.status_code for response in responses] == [200] * 6
+    assert all(stats["admitted"] == 0 for stats in controller.stats().values())
+
+
+def test_route_classes_do_not_share_slots():
+    app, controller = make_app(LIMITS)
+
+    responses = send_concurrently(app, [
+        ("POST", "/api/bookings?hold=0.1"),
+        ("GET", "/api/training-sessions?hold=0.1"),
+        ("POST", "/api/auth/session?hold=0.1"),
+    ])
+
+    assert [response.status_code for response in responses] == [200, 200, 200]
+
+
+def book_concurrently(client, session_id, tokens):
+    """POST a booking for `session_id` with each token at once"""
+    responses = []
+
+    def book(token):
+        responses.append(client.post(
+            "/api/bookings",
+            json={"session_id": session_id, "student_id": "", "booking_date": ""},
+            headers={"Authorization": f"Bearer {token}"},
+        ))
+
+    threads = [threading.Thread(target=book, args=(token,)) for token in tokens]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return responses
+
+
+def slow_lookup(find_one):
+    def slow_find_one(*args, **kwargs):
+        document = find_one(*args, **kwargs)
+        time.sleep(0.2)
+        return document
+
+    return slow_find_one
+
+
+@pytest.fixture
+def booking_client(monkeypatch):
+    with TestClient(server.app) as client:
+        server.db.training_sessions.insert_one({
+            "session_id": "last-seat", "title": "Тренировка", "date": "2100-01-01", "time": "18:00",
+            "coach_name": "Мурат", "location": "Астана", "price": 3000.0,
+            "current_participants": 0, "max_participants": 1, "status": "active",
+        })
+
+        # Widen the race window: every request reads before any of them writes
+        for collection in (server.db.training_sessions, server.db.bookings):
+            monkeypatch.setattr(collection, "find_one", slow_lookup(collection.find_one))
+        yield client
+
+
+def login(client, email):
+    return client.post("/api/auth/session", json={"session_id": f"stub:{email}"}).json()["session_token"]
+
+
+def test_concurrent_bookings_never_overbook(booking_client):
+    tokens = [login(booking_client, f"student{index}@aiga.kz") for index in range(5)]
+
+    responses = book_concurrently(booking_client, "last-seat", tokens)
+
+    assert sorted(response.status_code for response in responses) == [200, 400, 400, 400, 400]
+    assert {response.json()["detail"] for response in responses if response.status_code == 400} == {"Session is full"}
+    assert server.db.training_sessions.find_one({"session_id": "last-seat"})["current_participants"] == 1
+    assert server.db.bookings.count_documents({"session_id": "last-seat"}) == 1
+
+
+def test_concurrent_duplicate_bookings_give_seats_back(booking_client):
+    server.db.training_sessions.update_one({"session_id": "last-seat"}, {"$set": {"max_participants": 10}})
+    token = login(booking_client, "student@aiga.kz")
+
+    responses = book_concurrently(booking_client, "last-seat", [token] * 5)
+
+    assert sorted(response.status_code for response in responses) == [200, 400, 400, 400, 400]
+    assert {response.json()["detail"] for response in responses if response.status_code == 400} == {"Already booked this session"}
+    assert server.db.training_sessions.find_one({"session_id": "last-seat"})["current_participants"] == 1
+    assert server.db.bookings.count_documents({"session_id": "last-seat"}) == 1
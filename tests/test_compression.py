@@ -0,0 +1,154 @@
+import gzip
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+import compression
+import server
+from compression import CompressionMiddleware, choose_encoding
+from payloads import compact_documents
+
+LARGE = {"items": ["AIGA Academy, г. Астана, ул. Ахмедьярова, 3"] * 50}
+
+
+@pytest.fixture
+def no_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+
+
+def test_choose_encoding_prefers_brotli_and_honours_q_values():
+    assert choose_encoding("gzip, br") == "br"
+    assert choose_encoding("gzip;q=1.0, br;q=0.5") == "gzip"
+    assert choose_encoding("br;q=0, gzip") == "gzip"
+    assert choose_encoding("gzip;q=0") is None
+    assert choose_encoding("*") == "br"
+    assert choose_encoding("*, br;q=0") == "gzip"
+    assert choose_encoding("identity") is None
+    assert choose_encoding("") is None
+
+
+def test_choose_encoding_falls_back_to_gzip_without_brotli(no_brotli):
+    assert choose_encoding("br, gzip;q=0.1") == "gzip"
+    assert choose_encoding("br") is None
+
+
+async def large_json(request):
+    return JSONResponse(LARGE)
+
+
+async def small_json(request):
+    return JSONResponse({"status": "ok"})
+
+
+async def image(request):
+    return Response(b"\x89PNG" + b"\x00" * 2000, media_type="image/png")
+
+
+async def encoded(request):
+    return Response(gzip.compress(json.dumps(LARGE).encode()), media_type="application/json", headers={"Content-Encoding": "gzip"})
+
+
+async def chunked(request):
+    async def chunks():
+        for item in LARGE["items"]:
+            yield json.dumps(item).encode()
+
+    return StreamingResponse(chunks(), media_type="application/json")
+
+
+@pytest.fixture
+def client():
+    routes = [Route(f"/{endpoint.__name__}", endpoint) for endpoint in (large_json, small_json, image, encoded, chunked)]
+    app = Starlette(routes=routes)
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+def test_large_json_is_compressed(client, encoding):
+    response = client.get("/large_json", headers={"Accept-Encoding": encoding})
+
+    assert response.headers["content-encoding"] == encoding
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(json.dumps(LARGE, ensure_ascii=False).encode())
+    assert response.json() == LARGE
+
+
+def test_small_json_is_left_alone(client):
+    response = client.get("/small_json", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"status": "ok"}
+
+
+def test_non_json_and_encoded_responses_pass_through(client):
+    response = client.get("/image", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.content.startswith(b"\x89PNG")
+
+    response = client.get("/encoded", headers={"Accept-Encoding": "br"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json() == LARGE
+
+
+def test_chunked_body_is_buffered_and_compressed(client):
+    response = client.get("/chunked", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-length"] == str(len(gzip.compress(response.content, compresslevel=compression.GZIP_LEVEL)))
+    assert response.content == b"".join(json.dumps(item).encode() for item in LARGE["items"])
+
+
+def test_no_accepted_encoding_passes_through(client):
+    response = client.get("/large_json", headers={"Accept-Encoding": "identity"})
+
+    assert "content-encoding" not in response.headers
+    assert response.json() == LARGE
+
+
+def test_compact_documents_uses_lookup_tables():
+    items = [
+        {"id": 1, "session": {"coach_name": "Мурат", "location": "Астана"}},
+        {"id": 2, "session": {"coach_name": "Алия", "location": "Астана"}},
+        {"id": 3, "session": {"coach_name": "Мурат", "location": None}},
+        {"id": 4, "session": {"location": 42}},
+        {"id": 5},
+    ]
+
+    compacted = compact_documents(items, ["session.coach_name", "session.location"])
+
+    assert compacted["lookups"] == {"coach_name": ["Мурат", "Алия"], "location": ["Астана"]}
+    assert [item.get("session") for item in compacted["items"]] == [
+        {"coach_name": 0, "location": 0},
+        {"coach_name": 1, "location": 0},
+        {"coach_name": 0, "location": None},
+        {"location": 42},
+        None,
+    ]
+
+
+def test_compact_query_parameter_on_list_endpoints():
+    with TestClient(server.app) as client:
+        headers = {"Authorization": f"Bearer {client.post('/api/auth/session', json={'session_id': 'stub:compact@aiga.kz'}).json()['session_token']}"}
+        server.db.training_sessions.insert_one({
+            "session_id": "s1", "title": "Тренировка", "coach_name": "Мурат", "location": "Астана",
+            "date": "2100-01-01", "time": "18:00", "price": 3000.0,
+            "current_participants": 0, "max_participants": 10, "status": "active",
+        })
+        assert client.post("/api/bookings", json={"session_id": "s1", "student_id": "", "booking_date": ""}, headers=headers).status_code == 200
+
+        sessions = client.get("/api/training-sessions", params={"compact": "true"}).json()
+        assert sessions["format"] == "compact"
+        assert sessions["lookups"]["coach_name"] == ["Мурат"]
+        assert sessions["items"][0]["location"] == 0
+        assert "_id" not in sessions["items"][0]
+
+        bookings = client.get("/api/bookings/my", params={"compact": "true"}, headers=headers).json()
+        assert bookings["lookups"] == {"coach_name": ["Мурат"], "location": ["Астана"]}
+        assert bookings["items"][0]["session"]["coach_name"] == 0
+
+        assert isinstance(client.get("/api/training-sessions").json(), list)
@@ -0,0 +1,72 @@
+from fastapi.testclient import TestClient
+
+import server
+from diagnostics import SlowQueryLog, redact_filter, summarize_explain
+
+EXPLAIN_OUTPUT = {
+    "queryPlanner": {
+        "parsedQuery": {"session_token": {"$eq": "secret-token"}},
+        "winningPlan": {
+            "stage": "FETCH",
+            "inputStage": {"stage": "IXSCAN", "indexBounds": {"session_token": ['["secret-token", "secret-token"]']}},
+        },
+    },
+    "executionStats": {"nReturned": 1, "executionTimeMillis": 3, "totalKeysExamined": 1, "totalDocsExamined": 1},
+    "command": {"find": "sessions", "filter": {"session_token": "secret-token"}},
+}
+
+PROFILE = {
+    "name": "Айдар Нурланов",
+    "email": "aidar@example.com",
+    "phone": "+77771234567",
+    "age": 28,
+    "weight": 75.5,
+    "height": 180.0,
+    "martial_arts_experience": "2 года грэпплинга",
+    "goals": "Улучшить технику",
+    "emergency_contact": "Нурлан Айдаров +77779876543",
+}
+
+
+def test_redact_filter_hides_values():
+    assert redact_filter({"session_token": "abc", "status": {"$in": ["a", "b"]}}) == {
+        "session_token": "?",
+        "status": {"$in": ["?"]},
+    }
+
+
+def test_explain_summary_drops_literal_values():
+    summary = summarize_explain(EXPLAIN_OUTPUT)
+
+    assert summary == {
+        "winning_plan": ["FETCH", "IXSCAN"],
+        "docs_examined": 1,
+        "keys_examined": 1,
+        "n_returned": 1,
+        "execution_time_ms": 3,
+    }
+    assert "secret-token" not in repr(summary)
+
+
+def test_top_offenders_only_returns_explain_summary():
+    log = SlowQueryLog(threshold_ms=0)
+    log.explain = lambda database, command: EXPLAIN_OUTPUT
+    log.record("GET /api/users/profile", "aiga_connect", "sessions", "find",
+               {"find": "sessions", "filter": {"session_token": "secret-token"}}, 150.0)
+
+    offenders = log.top_offenders(explain=True)
+
+    assert offenders[0]["explain"]["docs_examined"] == 1
+    assert "secret-token" not in repr(offenders)
+
+
+def test_admin_role_cannot_be_self_assigned():
+    with TestClient(server.app) as client:
+        token = client.post("/api/auth/session", json={"session_id": "stub:mallory@example.com"}).json()["session_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        response = client.post("/api/users/complete-profile", json={**PROFILE, "role": "admin"}, headers=headers)
+        assert response.status_code == 422
+
+        assert client.get("/api/admin/slow-queries", headers=headers).status_code == 403
+        assert client.get("/api/admin/admission", headers=headers).status_code == 403
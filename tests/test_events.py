@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+import pytest
+
+from database import Database
+from events import ChangeStreamTailer, EventBus
+
+
+class FakeChangeStream:
+    """Yields the given change events once, then behaves like an idle stream"""
+
+    def __init__(self, changes):
+        self.changes = changes
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def try_next(self):
+        if self.changes:
+            return self.changes.pop(0)
+        time.sleep(0.01)
+        return None
+
+
+def insert_change(token, collection, document):
+    return {"_id": {"_data": token}, "ns": {"db": "aiga_connect", "coll": collection}, "fullDocument": dict(document)}
+
+
+def watch_returning(changes):
+    return lambda pipeline, resume_after=None, max_await_time_ms=None: FakeChangeStream(list(changes))
+
+
+async def tail(tailer, bus, received, expected):
+    bus.start()
+    tailer.start()
+    deadline = time.monotonic() + 5
+    while len(received) < expected and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    await tailer.stop()
+    await bus.stop()
+
+
+def test_workers_tail_under_their_own_names_with_shared_event_ids():
+    changes = [
+        insert_change("token-1", "users", {"_id": "a", "user_id": "u1"}),
+        insert_change("token-2", "bookings", {"_id": "b", "booking_id": "b1"}),
+    ]
+    db = Database("mongodb://unused", "aiga_connect", backend="memory")
+    received = []
+
+    async def run_workers():
+        for name in ("api-1", "api-2"):
+            # Every worker's stream sees the same inserts
+            db.connect().watch = watch_returning(changes)
+            bus = EventBus()
+            bus.subscribe("collect", ["*"], lambda events: received.extend(events), max_wait_seconds=0.01)
+            await tail(ChangeStreamTailer(db, bus, name=name), bus, received, len(received) + 2)
+
+    asyncio.run(run_workers())
+
+    assert [(event["type"], event["event_id"]) for event in received] == [
+        ("user.created", "token-1"), ("booking.created", "token-2"),
+    ] * 2
+    assert "_id" not in received[0]["data"]
+    tokens = {doc["tailer"]: doc["resume_token"] for doc in db["event_resume_tokens"].find({})}
+    assert tokens == {"api-1": {"_data": "token-2"}, "api-2": {"_data": "token-2"}}
+
+
+def test_analytics_ignores_events_already_recorded_by_another_worker():
+    import server
+
+    server.db.connect()
+    try:
+        events = [
+            {"event_id": "token-1", "type": "user.created", "occurred_at": time.time(), "data": {"user_id": "u1", "email": "x@aiga.kz"}},
+        ]
+        server.record_analytics(events)
+        server.record_analytics(events)
+
+        recorded = list(server.db.analytics_events.find({}, {"_id": 0}))
+        assert len(recorded) == 1
+        assert recorded[0]["refs"] == {"user_id": "u1"}
+    finally:
+        server.db.close()
+
+
+def test_tailer_requires_a_stable_name():
+    db = Database("mongodb://unused", "aiga_connect", backend="memory")
+    tailer = ChangeStreamTailer(db, EventBus(), name="")
+
+    with pytest.raises(ValueError, match="EVENT_TAILER_NAME"):
+        tailer.start()
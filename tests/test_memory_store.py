@@ -0,0 +1,35 @@
+import pytest
+
+from auth_provider import StubAuthProvider, get_auth_provider
+from memory_store import DuplicateKeyError, MemoryDatabase
+
+
+def test_unique_index_rejects_duplicate_inserts():
+    db = MemoryDatabase("test")
+    db.revoked_tokens.create_index("jti", unique=True)
+    db.revoked_tokens.insert_one({"jti": "a"})
+
+    with pytest.raises(DuplicateKeyError):
+        db.revoked_tokens.insert_one({"jti": "a"})
+    assert db.revoked_tokens.count_documents({}) == 1
+
+
+def test_unique_index_applies_to_updates_and_upserts():
+    db = MemoryDatabase("test")
+    db.notifications.create_index("booking_id", unique=True)
+    db.notifications.insert_one({"booking_id": "b1"})
+    db.notifications.insert_one({"booking_id": "b2"})
+
+    with pytest.raises(DuplicateKeyError):
+        db.notifications.update_one({"booking_id": "b2"}, {"$set": {"booking_id": "b1"}})
+    assert db.notifications.find_one({"booking_id": "b2"}) is not None
+
+    result = db.notifications.update_one({"booking_id": "b1"}, {"$setOnInsert": {"status": "queued"}}, upsert=True)
+    assert result.upserted_id is None
+    assert db.notifications.count_documents({}) == 2
+
+
+def test_stub_auth_requires_memory_storage():
+    assert isinstance(get_auth_provider("stub", storage_backend="memory"), StubAuthProvider)
+    with pytest.raises(ValueError):
+        get_auth_provider("stub", storage_backend="mongo")
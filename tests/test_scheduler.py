@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from memory_store import MemoryDatabase
+from scheduler import complete_past_sessions, purge_expired_tokens, queue_session_reminders
+
+
+def day(offset):
+    return (datetime.now() + timedelta(days=offset)).strftime("%Y-%m-%d")
+
+
+def add_session(db, session_id, date, status="active"):
+    db.training_sessions.insert_one({
+        "session_id": session_id,
+        "title": f"Тренировка {session_id}",
+        "date": date,
+        "time": "18:00",
+        "status": status,
+    })
+
+
+def add_booking(db, booking_id, session_id, booked_at=None):
+    db.bookings.insert_one({
+        "booking_id": booking_id,
+        "session_id": session_id,
+        "student_id": f"student-{booking_id}",
+        "booking_date": (booked_at or datetime.now()).isoformat(),
+        "status": "confirmed",
+    })
+
+
+@pytest.fixture
+def db():
+    return MemoryDatabase("test")
+
+
+def test_complete_past_sessions(db):
+    add_session(db, "past-1", day(-3))
+    add_session(db, "past-2", day(-1))
+    add_session(db, "today", day(0))
+    add_session(db, "cancelled", day(-2), status="cancelled")
+
+    assert complete_past_sessions(db, batch_size=1) == 2
+    assert complete_past_sessions(db) == 0
+    assert db.training_sessions.count_documents({"status": "completed"}) == 2
+    assert db.training_sessions.find_one({"session_id": "today"})["status"] == "active"
+
+
+def test_purge_expired_tokens(db):
+    now = datetime.now()
+    for index in range(3):
+        db.sessions.insert_one({"session_token": f"old-{index}", "expires_at": now - timedelta(minutes=index + 1)})
+    db.sessions.insert_one({"session_token": "live", "expires_at": now + timedelta(days=1)})
+    db.revoked_tokens.insert_one({"jti": "old", "expires_at": now - timedelta(minutes=1)})
+    db.revoked_tokens.insert_one({"jti": "live", "expires_at": now + timedelta(days=1)})
+
+    assert purge_expired_tokens(db, batch_size=2) == 3
+    assert [token["session_token"] for token in db.sessions.find({})] == ["live"]
+    assert [token["jti"] for token in db.revoked_tokens.find({})] == ["live"]
+
+
+def test_queue_session_reminders(db):
+    add_session(db, "tomorrow", day(1))
+    add_session(db, "next-week", day(7))
+    add_booking(db, "b1", "tomorrow")
+    add_booking(db, "b2", "tomorrow")
+    add_booking(db, "b3", "next-week")
+
+    assert queue_session_reminders(db) == 2
+    assert queue_session_reminders(db) == 0
+    assert {notification["booking_id"] for notification in db.notifications.find({})} == {"b1", "b2"}
+
+
+def test_queue_session_reminders_batches_upserts(db, monkeypatch):
+    add_session(db, "tomorrow", day(1))
+    for index in range(5):
+        add_booking(db, f"b{index}", "tomorrow")
+    db.notifications.insert_one({"booking_id": "b0"})
+
+    bulk_write = db.notifications.bulk_write
+    batches = []
+
+    def counting_bulk_write(requests, ordered=True):
+        batches.append(len(requests))
+        return bulk_write(requests, ordered)
+
+    monkeypatch.setattr(db.notifications, "bulk_write", counting_bulk_write)
+
+    assert queue_session_reminders(db, batch_size=2) == 4
+    assert batches == [2, 2, 1]
+    assert db.notifications.count_documents({}) == 5
+
+
+def test_queue_session_reminders_picks_up_late_bookings(db):
+    add_session(db, "tomorrow", day(1))
+    add_booking(db, "early", "tomorrow")
+
+    first_run = datetime.now()
+    assert queue_session_reminders(db) == 1
+
+    # A booking made after the first run still gets its reminder
+    add_booking(db, "late", "tomorrow")
+    assert queue_session_reminders(db, since=first_run) == 1
+    assert queue_session_reminders(db, since=datetime.now()) == 0
+    assert db.notifications.count_documents({}) == 2
+
+
+def test_queue_session_reminders_covers_sessions_entering_the_window(db):
+    # Booked long ago, but the session only now enters the lead window
+    add_session(db, "tomorrow", day(1))
+    add_booking(db, "old", "tomorrow", booked_at=datetime.now() - timedelta(days=10))
+
+    assert queue_session_reminders(db, since=datetime.now() - timedelta(days=2)) == 1
+
+
+def test_jobs_run_through_the_database_handle():
+    from database import Database
+
+    db = Database("", "test", backend="memory")
+    add_session(db, "past", day(-1))
+
+    assert db["training_sessions"].count_documents({}) == 1
+    assert complete_past_sessions(db) == 1
@@ -0,0 +1,34 @@
+from memory_store import MemoryDatabase
+from stats import StatsCache
+
+
+def test_counts_are_cached_until_invalidated():
+    db = MemoryDatabase("test")
+    cache = StatsCache(db)
+    db.users.insert_one({"user_id": "u1"})
+    assert cache.get()["total_users"] == 1
+
+    db.users.insert_one({"user_id": "u2"})
+    assert cache.get()["total_users"] == 1
+
+    cache.invalidate()
+    assert cache.get()["total_users"] == 2
+
+
+def test_invalidation_during_a_recount_is_not_lost(monkeypatch):
+    db = MemoryDatabase("test")
+    cache = StatsCache(db)
+    count_documents = db.bookings.count_documents
+
+    def count_then_write(filter):
+        # The bookings count is read, then a booking lands and its event invalidates the cache
+        count = count_documents(filter)
+        db.bookings.insert_one({"booking_id": "b1"})
+        cache.invalidate()
+        return count
+
+    monkeypatch.setattr(db.bookings, "count_documents", count_then_write)
+    assert cache.get()["total_bookings"] == 0
+
+    monkeypatch.setattr(db.bookings, "count_documents", count_documents)
+    assert cache.get()["total_bookings"] == 1
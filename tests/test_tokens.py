@@ -0,0 +1,114 @@
+import time
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+
+from memory_store import MemoryDatabase
+from tokens import InvalidSessionToken, RevocationList, SessionTokenService
+
+OLD_KEY = "k1:" + "a" * 32
+NEW_KEY = "k2:" + "b" * 32
+
+
+def make_service(db, signing_keys=OLD_KEY, ttl_days=7):
+    return SessionTokenService(RevocationList(db), token_format="signed", signing_keys=signing_keys, ttl_days=ttl_days)
+
+
+def test_issued_token_verifies_to_its_user():
+    service = make_service(MemoryDatabase("test"))
+    token, expires_at = service.issue("user-1")
+
+    assert service.is_signed(token)
+    assert service.verify(token)["sub"] == "user-1"
+    assert jwt.get_unverified_header(token)["kid"] == "k1"
+
+
+def test_rotated_keys_keep_old_tokens_valid_and_reject_unknown_kids():
+    db = MemoryDatabase("test")
+    old_token, _ = make_service(db).issue("user-1")
+    rotated = make_service(db, signing_keys=f"{NEW_KEY},{OLD_KEY}")
+
+    new_token, _ = rotated.issue("user-2")
+    assert jwt.get_unverified_header(new_token)["kid"] == "k2"
+    assert rotated.verify(old_token)["sub"] == "user-1"
+    assert rotated.verify(new_token)["sub"] == "user-2"
+
+    # Once the old key is dropped its tokens no longer verify
+    with pytest.raises(InvalidSessionToken, match="Invalid session token"):
+        make_service(db, signing_keys=NEW_KEY).verify(old_token)
+
+
+def test_forged_and_expired_tokens_are_rejected():
+    service = make_service(MemoryDatabase("test"))
+    claims = {"sub": "user-1", "jti": "j1", "exp": int(time.time()) + 60}
+
+    forged = jwt.encode(claims, "c" * 32, algorithm="HS256", headers={"kid": "k1"})
+    with pytest.raises(InvalidSessionToken, match="Invalid session token"):
+        service.verify(forged)
+
+    expired = jwt.encode({**claims, "exp": int(time.time()) - 60}, "a" * 32, algorithm="HS256", headers={"kid": "k1"})
+    with pytest.raises(InvalidSessionToken, match="Session expired"):
+        service.verify(expired)
+
+
+def test_revocation_reaches_other_workers_on_sync():
+    db = MemoryDatabase("test")
+    worker_a = make_service(db)
+    worker_b = make_service(db)
+    token, _ = worker_a.issue("user-1")
+    worker_b.revocations.sync()
+    assert worker_b.verify(token)["sub"] == "user-1"
+
+    worker_a.revoke(worker_a.verify(token))
+    with pytest.raises(InvalidSessionToken):
+        worker_a.verify(token)
+
+    worker_b.revocations.sync()
+    with pytest.raises(InvalidSessionToken):
+        worker_b.verify(token)
+    assert len(worker_b.revocations) == 1
+
+
+def test_sync_picks_up_revocations_stamped_before_the_last_sync():
+    db = MemoryDatabase("test")
+    revocations = RevocationList(db)
+    revocations.sync()
+
+    # Another worker's write whose revoked_at predates this worker's last sync
+    db.revoked_tokens.insert_one({
+        "jti": "late",
+        "expires_at": datetime.now() + timedelta(days=1),
+        "revoked_at": datetime.now() - timedelta(minutes=5),
+    })
+    db.revoked_tokens.insert_one({
+        "jti": "expired",
+        "expires_at": datetime.now() - timedelta(seconds=1),
+        "revoked_at": datetime.now() - timedelta(minutes=5),
+    })
+    revocations.sync()
+    assert revocations.is_revoked("late")
+    assert not revocations.is_revoked("expired")
+
+
+def test_fresh_worker_rejects_revoked_tokens_on_its_first_request(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import server
+
+    # Another worker issued the token and logged it out before this one started
+    other_worker = make_service(MemoryDatabase("other"))
+    token, _ = other_worker.issue("user-1")
+    claims = other_worker.verify(token)
+
+    database = server.db.connect()
+    database.revoked_tokens.insert_one({"jti": claims["jti"], "expires_at": datetime.fromtimestamp(claims["exp"]), "revoked_at": datetime.now()})
+    revocation_list = RevocationList(server.db, sync_seconds=3600)
+    monkeypatch.setattr(server, "revocation_list", revocation_list)
+    monkeypatch.setattr(server, "session_tokens", SessionTokenService(revocation_list, token_format="signed", signing_keys=OLD_KEY))
+
+    with TestClient(server.app) as client:
+        response = client.get("/api/users/profile", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Invalid session token"
@@ -0,0 +1,48 @@
+from memory_store import MemoryDatabase
+from user_cache import UserCache
+
+
+def make_db():
+    db = MemoryDatabase("test")
+    db.users.insert_one({
+        "user_id": "u1",
+        "email": "coach@aiga.kz",
+        "role": "student",
+        "certifications": ["BJJ Black Belt"],
+    })
+    return db
+
+
+def test_profile_returns_every_field_but_object_id():
+    cache = UserCache(make_db())
+
+    profile = cache.get_profile("u1")
+
+    assert "_id" not in profile
+    assert profile["certifications"] == ["BJJ Black Belt"]
+    assert cache.get_role("u1") == "student"
+    assert cache.hits == 1
+
+
+def test_invalidate_reloads_profile():
+    db = make_db()
+    cache = UserCache(db)
+    cache.get_profile("u1")
+
+    db.users.update_one({"user_id": "u1"}, {"$set": {"name": "Мурат"}})
+    cache.invalidate("u1")
+
+    assert cache.get_profile("u1")["name"] == "Мурат"
+
+
+def test_denied_permission_is_rechecked_against_the_database():
+    db = make_db()
+    worker_a, worker_b = UserCache(db), UserCache(db)
+    assert not worker_b.has_permission("u1", "training_sessions:create")
+
+    # Promoted through worker A; worker B still caches the student role
+    db.users.update_one({"user_id": "u1"}, {"$set": {"role": "coach"}})
+    worker_a.invalidate("u1")
+
+    assert worker_b.has_permission("u1", "training_sessions:create")
+    assert worker_b.get_role("u1") == "coach"